@@ -0,0 +1,59 @@
+"""Замер скорости подсчёта топ-10 слов на ленте, увеличенной в заданное число раз относительно newsafr.json.
+Для сравнения запускается и прежний алгоритм (line.count для каждого слова строки), результаты сверяются.
+Запуск: python bench_top_10.py [во сколько раз увеличить ленту] [--no-legacy]"""
+import json
+import sys
+import time
+
+from json_xml_file import get_top_10
+
+
+def legacy_top_10(lst):
+    """Прежняя реализация get_top_10: квадратичный подсчёт в каждой строке и просмотр словаря для каждого места"""
+    word_dict = {}
+    for line in lst:
+        line = legacy_prepare_line(line)
+        for word in set(line):
+            word_dict[word] = word_dict.get(word, 0) + line.count(word)
+    top_10_nums = tuple(sorted(set(word_dict.values()), reverse=True)[:10])
+    top_10 = []
+    for place, num in enumerate(top_10_nums, start=1):
+        for word, count in word_dict.items():
+            if count == num:
+                top_10.append(f'{place} место: "{word}" - {num} раз')
+    return top_10_nums, top_10
+
+
+def legacy_prepare_line(line):
+    line = line.lower().replace(",", "").replace("'", "").replace('"', "").replace('.', "").strip().split()
+    trash = [word for word in line if len(word) < 7]
+    for word in trash:
+        if word in line:
+            line.remove(word)
+    return line
+
+
+def measure(function, lines):
+    started = time.perf_counter()
+    result = function(lines)
+    return result, time.perf_counter() - started
+
+
+def main():
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 1000
+    with open("newsafr.json", encoding="utf-8") as f:
+        descriptions = [item["description"] for item in json.load(f)["rss"]["channel"]["items"]]
+    lines = descriptions * factor
+    print(f"Лента: {len(lines)} новостей, {sum(map(len, descriptions)) * factor / 10 ** 6:.1f} млн символов")
+
+    result, elapsed = measure(get_top_10, lines)
+    print(f"get_top_10: {elapsed:.2f} с")
+    if "--no-legacy" not in sys.argv:
+        legacy, legacy_elapsed = measure(legacy_top_10, lines)
+        same = legacy[0] == result[0] and sorted(legacy[1]) == sorted(result[1])
+        print(f"прежний алгоритм: {legacy_elapsed:.2f} с, ускорение в {legacy_elapsed / elapsed:.1f} раз, "
+              f"результаты {'совпадают' if same else 'РАЗЛИЧАЮТСЯ'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -13,10 +13,25 @@
 
 
 import xml.etree.ElementTree as ET
+import codecs
+import heapq
 import json
-
-
-def get_json(file_path):
+import mmap
+from collections import Counter
+
+# символы, которые удаляются из текста перед разбиением на слова
+# (цепочка str.replace для кириллицы работает на порядок быстрее str.translate)
+PUNCTUATION = (",", "'", '"', ".")
+MIN_LENGTH = 7
+ITEMS_PATH = ("rss", "channel", "items")
+WHITESPACE = b" \t\r\n"
+
+
+def get_json(file_path, stream=True):
+    """Функция возвращает топ-10 слов из описаний новостей json-файла (или NDJSON-файла с новостью в каждой строке).
+    При stream=True новости читаются по одной, иначе весь документ загружается в память."""
+    if stream:
+        return rank(count_words(iter_json_descriptions(file_path)))
     json_desc_lst = []
     with open(file_path, encoding="utf-8") as f:
         file = json.load(f)
@@ -26,7 +41,106 @@ def get_json(file_path):
     return json_top_10
 
 
-def get_xml(file_path):
+def iter_json_descriptions(file_path):
+    """Генератор по одному возвращает описания новостей из json-файла (rss.channel.items)
+    или из NDJSON-файла, где каждая строка - отдельная новость"""
+    if file_path.endswith(".ndjson"):
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)["description"]
+        return
+    for item in iter_json_array(file_path, ITEMS_PATH):
+        yield item["description"]
+
+
+def iter_json_array(file_path, path):
+    """Генератор по одному разбирает элементы массива, лежащего в json-файле по цепочке ключей path.
+    Файл по возможности отображается в память через mmap, и в каждый момент декодируется только
+    текущий элемент, поэтому весь документ не превращается в объекты Python."""
+    with open(file_path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # пустой файл или файл, который нельзя отобразить в память
+            data = f.read()
+        try:
+            cursor = JSONCursor(data)
+            for key in path:
+                cursor.find_key(key)
+            cursor.expect(b"[")
+            while cursor.skip() != b"]":
+                yield cursor.value()
+                if cursor.skip() == b",":
+                    cursor.pos += 1
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+class JSONCursor:
+    """Класс последовательно читает json-документ из байтов (в том числе из mmap).
+    Значения декодируются стандартным json.JSONDecoder по окну байтов, которое растёт, пока значение не поместится."""
+
+    decoder = json.JSONDecoder()
+
+    def __init__(self, data, window=4096):
+        self.data = data
+        self.pos = 0
+        self.window = window
+
+    def skip(self):
+        """Метод пропускает пробельные символы и возвращает следующий байт (b"" в конце документа)"""
+        while self.data[self.pos:self.pos + 1] in WHITESPACE and self.pos < len(self.data):
+            self.pos += 1
+        return self.data[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.skip() != char:
+            raise ValueError(f"Ожидался символ {char.decode()} в позиции {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Метод декодирует одно значение, начиная с текущей позиции, и переходит за него"""
+        self.skip()
+        size = self.window
+        while True:
+            chunk = self.data[self.pos:self.pos + size]
+            text = codecs.getincrementaldecoder("utf-8")().decode(chunk)
+            complete = self.pos + size >= len(self.data)
+            try:
+                value, end = self.decoder.raw_decode(text)
+            except json.JSONDecodeError:
+                if complete:
+                    raise
+            else:
+                # число в самом конце окна могло быть обрезано, поэтому окно увеличивается
+                if end < len(text) or complete:
+                    self.pos += len(text[:end].encode("utf-8"))
+                    return value
+            size *= 2
+
+    def find_key(self, key):
+        """Метод ищет ключ key в объекте, начинающемся с текущей позиции, пропуская значения других ключей,
+        и останавливается перед значением найденного ключа"""
+        self.expect(b"{")
+        while self.skip() != b"}":
+            name = self.value()
+            self.expect(b":")
+            if name == key:
+                self.skip()
+                return
+            self.value()
+            if self.skip() == b",":
+                self.pos += 1
+        raise KeyError(key)
+
+
+def get_xml(file_path, stream=True):
+    """Функция возвращает топ-10 слов из описаний новостей xml-файла.
+    При stream=True файл читается потоково, иначе в память загружается всё дерево документа."""
+    if stream:
+        return rank(count_words(iter_xml_descriptions(file_path)))
     xml_desc_lst = []
     parser = ET.XMLParser(encoding="utf-8")
     file = ET.parse(file_path, parser)
@@ -37,46 +151,60 @@ def get_xml(file_path):
     return xml_top_10
 
 
-def get_top_10(lst):
-    word_dict = {}
-    for line in lst:
-        line = prepare_line(line)
-        line_set = set(line)
-        for word in line_set:
-            counter = 0
-            counter += line.count(word)
-            if word not in word_dict.keys():
-                word_dict[word] = counter
-            else:
-                word_dict[word] += counter
-
-    values_list = list(set(word_dict.values()))
-    values_list.sort(reverse=True)
-    top_10_nums = tuple(values_list[:10])
-    top_10 = []
-    for num in enumerate(top_10_nums):
-        for keys, values in word_dict.items():
-            if num[1] == values:
-                top_10.append(f'{num[0] + 1} место: "{keys}" - {num[1]} раз')
-    return top_10_nums, top_10
+def iter_xml_descriptions(file_path):
+    """Генератор по одному возвращает тексты channel/item/description, читая файл через iterparse.
+    Обработанные элементы сразу удаляются из дерева, поэтому расход памяти не зависит от размера ленты."""
+    path = []
+    channel = None
+    parser = ET.XMLParser(encoding="utf-8")
+    for event, elem in ET.iterparse(file_path, events=("start", "end"), parser=parser):
+        if event == "start":
+            path.append(elem.tag)
+            if len(path) == 2 and elem.tag == "channel":
+                channel = elem
+            continue
+        if path[1:] == ["channel", "item", "description"]:
+            yield elem.text or ""
+        path.pop()
+        if len(path) == 2 and channel is not None:
+            # закончился очередной дочерний элемент channel - удаляем его вместе с потомками
+            channel.clear()
+
+
+def get_top_10(lst, places=10):
+    """Функция возвращает кортеж из не более чем places наибольших различных количеств повторений слов
+    и список строк вида '<место> место: "<слово>" - <количество> раз'.
+    Слова с одинаковым количеством повторений делят место между собой."""
+    return rank(count_words(lst), places)
+
+
+def count_words(lines, counter=None):
+    """Функция за один проход по текстам считает слова длиннее 6 символов.
+    Строки могут поступать из генератора: в памяти хранится только счётчик."""
+    counter = Counter() if counter is None else counter
+    for line in lines:
+        counter.update(prepare_line(line))
+    return counter
+
+
+def rank(counter, places=10):
+    """Функция выбирает с помощью кучи places наибольших различных значений счётчика
+    и за один проход по счётчику собирает слова с этими значениями"""
+    top_nums = tuple(heapq.nlargest(places, set(counter.values())))
+    place_of = {num: place for place, num in enumerate(top_nums, start=1)}
+    words = {num: [] for num in top_nums}
+    for word, num in counter.items():
+        if num in place_of:
+            words[num].append(word)
+    top = [f'{place_of[num]} место: "{word}" - {num} раз' for num in top_nums for word in words[num]]
+    return top_nums, top
 
 
 def prepare_line(line: str) -> list:
     line = line.lower()
-    line = line.replace(",", "")
-    line = line.replace("'", "")
-    line = line.replace('"', "")
-    line = line.replace('.', "")
-    line = line.strip().split()
-    trash = []
-    for word in line:
-        if len(word) < 7:
-            trash.append(word)
-
-    for wordy in trash:
-        if wordy in line:
-            line.remove(wordy)
-    return line
+    for char in PUNCTUATION:
+        line = line.replace(char, "")
+    return [word for word in line.split() if len(word) >= MIN_LENGTH]
 
 
 def main():
@@ -12,14 +12,77 @@ HOST: https://cloud-api.yandex.net:443
 
 import requests as r
 import os
+import json
+import hashlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+
+class UploadManifest:
+    """Журнал загрузки: по одной json-строке на каждый загруженный файл (путь, размер, время изменения, хэш,
+    состояние). Строки только дописываются в конец файла, поэтому прерванная загрузка продолжается с того места,
+    где остановилась, а неизменённые файлы при повторном запуске пропускаются без обращения к Яндекс.Диску."""
+    DONE = ("загружен", "был загружен ранее")
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.records = {}
+        self._lock = threading.Lock()
+        if os.path.exists(file_path):
+            with open(file_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # последняя строка могла остаться недописанной при прерывании загрузки
+                        continue
+                    self.records[record["path"]] = record
+
+    @staticmethod
+    def file_hash(full_path):
+        digest = hashlib.sha256()
+        with open(full_path, "rb") as f:
+            for data in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(data)
+        return digest.hexdigest()
+
+    def is_done(self, remote, full_path):
+        """Метод проверяет, был ли файл уже загружен и не изменился ли он с тех пор.
+        Хэш считается, только если размер совпадает, а время изменения - нет."""
+        record = self.records.get(remote)
+        if record is None or record["status"] not in self.DONE or not os.path.isfile(full_path):
+            return False
+        stat = os.stat(full_path)
+        if stat.st_size != record["size"]:
+            return False
+        if stat.st_mtime == record["mtime"]:
+            return True
+        if self.file_hash(full_path) == record["hash"]:
+            self.add(remote, full_path, record["status"])
+            return True
+        return False
+
+    def add(self, remote, full_path, status):
+        """Метод дописывает в журнал запись о файле"""
+        stat = os.stat(full_path)
+        record = {"path": remote, "size": stat.st_size, "mtime": stat.st_mtime,
+                  "hash": self.file_hash(full_path), "status": status}
+        with self._lock:
+            self.records[remote] = record
+            with open(self.file_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
 
 
 class YaUploader:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, check=True):
         self.file_path = file_path
         self.folder_name = os.path.basename(file_path)
         self.URL = f"https://cloud-api.yandex.net/v1/disk/resources?path={self.folder_name}"
         self.headers = {"port": "443", "Authorization": f"OAuth {token}"}
+        if not check:
+            return
         test = r.get(self.URL, headers=self.headers)
         if test.status_code == 404:
             creator = self.create_folder()
@@ -43,26 +106,137 @@ class YaUploader:
     def upload(self):
         """Метод загруджает файлы по списку file_list на яндекс диск"""
         file_list = self._get_files_from_folder()
-        message = str
+        manifest = self.manifest()
+        failed = []
 
         for file in file_list:
+            params = {"path": f"{self.folder_name}/{file}"}
+            full_path = os.path.join(self.file_path, file)
+            if manifest.is_done(params["path"], full_path):
+                print(f'Файл "{file}" не изменился с прошлой загрузки')
+                continue
+            href = r.get(f"https://cloud-api.yandex.net/v1/disk/resources/upload", params=params,
+                         headers=self.headers)
+            if href.status_code == 409 and self.error_name(href) == "DiskResourceAlreadyExistsError":
+                manifest.add(params["path"], full_path, "был загружен ранее")
+                print(f'Файл "{file}" был ранее загружен на Яндекс.Диск')
+                continue
+            if href.status_code != 200:
+                failed.append(file)
+                print(f'Файл "{file}" не загружен: {href.status_code} {self.error_name(href) or href.reason}')
+                continue
+            with open(full_path, "rb") as f:
+                put = r.put(href.json()["href"], data=f)
+            if put.status_code not in (201, 202):
+                failed.append(file)
+                print(f'Файл "{file}" не загружен: {put.status_code} {put.reason}')
+                continue
+            manifest.add(params["path"], full_path, "загружен")
+            print(f'Файл "{file}" успешно загружен на Яндекс.Диск')
+
+        if failed:
+            return (f"\n======\n\n"
+                    f"Не загружено файлов из папки {self.folder_name}: {len(failed)} из {len(file_list)}")
+        return f"\n======\n\nВсе файлы из папки {self.folder_name} загружены на Яндекс.Диск"
+
+    def manifest(self):
+        """Метод возвращает журнал загрузки каталога. Журнал хранится рядом с каталогом, а не внутри него,
+        чтобы не загружаться на Яндекс.Диск вместе с файлами."""
+        parent = os.path.dirname(os.path.abspath(self.file_path))
+        return UploadManifest(os.path.join(parent, f".{self.folder_name}.upload.jsonl"))
+
+    def _walk(self, path=None):
+        """Метод рекурсивно обходит каталог через os.scandir и возвращает пары
+        (путь к файлу на компьютере, путь к файлу на Яндекс.Диске) и список вложенных папок на Яндекс.Диске"""
+        path = path or self.file_path
+        files, folders = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                remote = self.folder_name + "/" + os.path.relpath(entry.path, self.file_path).replace(os.sep, "/")
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(remote)
+                    sub_files, sub_folders = self._walk(entry.path)
+                    files.extend(sub_files)
+                    folders.extend(sub_folders)
+                elif entry.is_file():
+                    files.append((entry.path, remote))
+        return files, folders
+
+    def upload_concurrent(self, workers=8):
+        """Метод загружает на Яндекс.Диск каталог self.file_path вместе с вложенными папками.
+        Файлы загружаются параллельно в workers потоков через общий пул соединений.
+        Возвращает словарь {путь на Яндекс.Диске: состояние} и печатает сводку."""
+        files, folders = self._walk()
+        manifest = self.manifest()
+        if all(manifest.is_done(remote, full_path) for full_path, remote in files):
+            print(f"Все файлы из папки {self.folder_name} не изменились с прошлой загрузки")
+            return {remote: "не изменился" for _full_path, remote in files}
+        session = r.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount("https://", adapter)
+
+        failed = {}
+
+        def _create(folder):
+            try:
+                put = session.put("https://cloud-api.yandex.net/v1/disk/resources", params={"path": folder},
+                                  headers=self.headers)
+            except r.RequestException as error:
+                failed[folder] = str(error)
+                return
+            # 409 DiskPathPointsToExistentDirectoryError - папка уже есть на Яндекс.Диске
+            if put.status_code not in (201, 409) or self.error_name(put) == "DiskPathDoesntExistsError":
+                failed[folder] = f"{put.status_code} {self.error_name(put) or put.reason}"
+
+        def _upload(pair):
+            full_path, remote = pair
+            if manifest.is_done(remote, full_path):
+                return remote, "не изменился"
+            parent = next((folder for folder in failed if remote.startswith(folder + "/")), None)
+            if parent is not None:
+                return remote, f"ошибка: папка {parent} не создана"
             try:
-                params = {"path": f"{self.folder_name}/{file}"}
-                full_path = os.path.join(self.file_path, file)
-                upload_url = r.get(f"https://cloud-api.yandex.net/v1/disk/resources/upload", params=params,
-                                   headers=self.headers).json()["href"]
+                href = session.get("https://cloud-api.yandex.net/v1/disk/resources/upload", params={"path": remote},
+                                   headers=self.headers)
+                if href.status_code == 409 and self.error_name(href) == "DiskResourceAlreadyExistsError":
+                    manifest.add(remote, full_path, "был загружен ранее")
+                    return remote, "был загружен ранее"
+                if href.status_code == 409:
+                    return remote, f"ошибка: 409 {self.error_name(href) or href.reason}"
+                href.raise_for_status()
                 with open(full_path, "rb") as f:
-                    r.put(upload_url, data=f)
-                    print(f'Файл "{file}" успешно загружен на Яндекс.Диск')
-                message = f"\n======\n\n" \
-                          f"Все файлы из папки {self.folder_name} успешно загружены на Яндекс.Диск"
-            except KeyError:
-
-                print(f'Файл "{file}" был ранее загружен на Яндекс.Диск')
-                message = (f'\n======\n\n'
-                           f'Все файлы из папки {self.folder_name} загружены на Яндекс.Диск')
-
-        return message
+                    session.put(href.json()["href"], data=f).raise_for_status()
+                manifest.add(remote, full_path, "загружен")
+                return remote, "загружен"
+            except (r.RequestException, OSError) as error:
+                return remote, f"ошибка: {error}"
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # родительские папки должны появиться раньше вложенных, поэтому папки создаются по уровням вложенности
+            _create(self.folder_name)
+            for depth in sorted({folder.count("/") for folder in folders}):
+                list(executor.map(_create, [folder for folder in folders if folder.count("/") == depth
+                                            and not any(folder.startswith(bad + "/") for bad in failed)]))
+            for folder, error in failed.items():
+                print(f'Папка "{folder}" не создана на Яндекс.Диске: {error}')
+            statuses = dict(executor.map(_upload, files))
+        session.close()
+
+        summary = Counter(status.split(":")[0] for status in statuses.values())
+        for remote, status in statuses.items():
+            if status.startswith("ошибка"):
+                print(f'Файл "{remote}": {status}')
+        print(f"\n======\n\nФайлов в папке {self.folder_name}: {len(statuses)}. " +
+              ", ".join(f"{status}: {count}" for status, count in summary.items()))
+        return statuses
+
+    @staticmethod
+    def error_name(response):
+        """Метод возвращает код ошибки Яндекс.Диска из тела ответа, например DiskResourceAlreadyExistsError"""
+        try:
+            return response.json().get("error")
+        except ValueError:
+            return None
 
     def create_folder(self):
         """метод создает папку на яндекс.диске с таким же именем как и в self.file_path"""
@@ -77,7 +251,5 @@ if __name__ == '__main__':
     folder_path = input("Укажите путь к папке с файлами: ")
     token = input("Введите токен для авторизации: ")
 
-    uploader = YaUploader(folder_path)
-    result = uploader.upload()
-
-    print(result)
+    uploader = YaUploader(folder_path, check=False)
+    uploader.upload_concurrent()
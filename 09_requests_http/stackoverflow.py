@@ -5,10 +5,18 @@
 
 import time
 import datetime
+import json
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests as r
 
 
 URL = "https://api.stackexchange.com/2.2/questions"
+STORE_FILE = "questions.db"
+IDS_LIMIT = 100
 
 # unix date
 now = int(time.mktime(datetime.date.today().timetuple()))
@@ -25,15 +33,245 @@ params = {
     "site": "stackoverflow",
 }
 
-questions = []
-resp = r.get(URL, params=params)
-for item in resp.json()['items']:
-    questions.append(item['title'])
-
-while len(resp.json()['items']) == 100:
-    params["page"] += 1
-    resp = r.get(URL, params=params)
-    for item in resp.json()['items']:
-        questions.append(item['title'])
-for question in enumerate(questions):
-    print(question[0]+1, question[1])
+
+def get_page(url, params, delay=0):
+    """Функция через delay секунд запрашивает одну страницу и возвращает разобранный ответ API"""
+    time.sleep(delay)
+    page = r.get(url, params=params).json()
+    if "error_id" in page:
+        raise RuntimeError(f'{page.get("error_name")}: {page.get("error_message")}')
+    return page
+
+
+class Quota:
+    """Общий для всех потоков лимит запросов к API. Уменьшается с каждым запросом и уточняется
+    по полю quota_remaining ответов."""
+
+    def __init__(self, budget):
+        self.remaining = budget
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Метод резервирует один запрос. Возвращает False, если лимит исчерпан."""
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def update(self, quota_remaining):
+        with self._lock:
+            self.remaining = min(self.remaining, quota_remaining)
+
+
+def fetch_pages(url, params, prefetch=False, quota=None):
+    """Генератор постранично запрашивает данные у StackExchange API, пока в ответе has_more.
+    Соблюдает паузу backoff, которую может потребовать API, и останавливается, когда исчерпана квота
+    (или общий лимит quota, если он передан).
+    При prefetch=True следующая страница запрашивается, пока обрабатывается текущая."""
+    params = dict(params, page=params.get("page", 1))
+    if quota is not None and not quota.take():
+        return
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(get_page, url, dict(params))
+        while future is not None:
+            page = future.result()
+            future = None
+            if quota is not None and "quota_remaining" in page:
+                quota.update(page["quota_remaining"])
+            more = page.get("has_more", False)
+            if more and (page.get("quota_remaining", 1) <= 0 or (quota is not None and not quota.take())):
+                print("Квота запросов к API исчерпана")
+                more = False
+            if more:
+                params["page"] += 1
+                next_page = (get_page, url, dict(params), page.get("backoff", 0))
+                if prefetch:
+                    future = executor.submit(*next_page)
+            yield page
+            if more and future is None:
+                future = executor.submit(*next_page)
+
+
+def fetch_items(url, params, prefetch=False, quota=None):
+    """Генератор по одному возвращает элементы со всех страниц, не накапливая их в памяти"""
+    for page in fetch_pages(url, params, prefetch, quota):
+        yield from page["items"]
+
+
+class NDJSONStore:
+    """Хранилище вопросов в файле NDJSON: по одной json-строке на вопрос, только дозапись в конец файла"""
+
+    def __init__(self, file_path):
+        # question_id: (creation_date, last_activity_date); при повторе id действует последняя строка файла
+        self.index = {}
+        if os.path.exists(file_path):
+            with open(file_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        item = json.loads(line)
+                        self.index[item["question_id"]] = (item["creation_date"], item.get("last_activity_date"))
+        self.file = open(file_path, "a", encoding="utf-8")
+
+    def _write(self, item):
+        self.index[item["question_id"]] = (item["creation_date"], item.get("last_activity_date"))
+        self.file.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def add(self, item):
+        """Метод записывает вопрос, если его ещё нет в хранилище. Возвращает True для нового вопроса."""
+        if item["question_id"] in self.index:
+            return False
+        self._write(item)
+        return True
+
+    def update(self, item):
+        """Метод дописывает новую версию вопроса, если у него изменилась дата последней активности.
+        Возвращает True, если вопрос обновлён."""
+        known = self.index.get(item["question_id"])
+        if known is None or known[1] == item.get("last_activity_date"):
+            return False
+        self._write(item)
+        return True
+
+    def high_water(self):
+        """Метод возвращает дату создания самого нового вопроса в хранилище (0, если оно пусто)"""
+        return max((created for created, _ in self.index.values()), default=0)
+
+    def ids_since(self, fromdate):
+        """Метод возвращает id вопросов, созданных не раньше fromdate"""
+        return [question_id for question_id, (created, _) in self.index.items() if created >= fromdate]
+
+    def commit(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SQLiteStore:
+    """Хранилище вопросов в базе SQLite с question_id в качестве первичного ключа"""
+
+    def __init__(self, file_path):
+        self.connection = sqlite3.connect(file_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS questions (question_id INTEGER PRIMARY KEY, creation_date INTEGER, "
+            "last_activity_date INTEGER, title TEXT, tags TEXT, data TEXT)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS questions_creation ON questions (creation_date)")
+
+    def add(self, item):
+        """Метод записывает вопрос, если его ещё нет в хранилище. Возвращает True для нового вопроса."""
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO questions VALUES (?, ?, ?, ?, ?, ?)",
+            (item["question_id"], item["creation_date"], item.get("last_activity_date"), item["title"],
+             ",".join(item.get("tags", [])), json.dumps(item, ensure_ascii=False)))
+        return cursor.rowcount == 1
+
+    def update(self, item):
+        """Метод перезаписывает вопрос, если у него изменилась дата последней активности.
+        Возвращает True, если вопрос обновлён."""
+        cursor = self.connection.execute(
+            "UPDATE questions SET last_activity_date = ?, title = ?, tags = ?, data = ? "
+            "WHERE question_id = ? AND last_activity_date IS NOT ?",
+            (item.get("last_activity_date"), item["title"], ",".join(item.get("tags", [])),
+             json.dumps(item, ensure_ascii=False), item["question_id"], item.get("last_activity_date")))
+        return cursor.rowcount == 1
+
+    def high_water(self):
+        """Метод возвращает дату создания самого нового вопроса в хранилище (0, если оно пусто)"""
+        return self.connection.execute("SELECT MAX(creation_date) FROM questions").fetchone()[0] or 0
+
+    def ids_since(self, fromdate):
+        """Метод возвращает id вопросов, созданных не раньше fromdate"""
+        return [row[0] for row in self.connection.execute(
+            "SELECT question_id FROM questions WHERE creation_date >= ?", (fromdate,))]
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+def open_store(file_path):
+    """Функция открывает хранилище SQLite для файлов .db и .sqlite, иначе - NDJSON"""
+    if file_path.endswith((".db", ".sqlite")):
+        return SQLiteStore(file_path)
+    return NDJSONStore(file_path)
+
+
+def shards(fromdate, todate, step=86400):
+    """Функция делит интервал [fromdate, todate) на интервалы длиной step секунд"""
+    return [(start, min(start + step, todate)) for start in range(fromdate, todate, step)]
+
+
+def harvest(tags, fromdate, todate, file_path, step=86400, workers=4, budget=1000):
+    """Функция собирает вопросы с тегами tags за интервал [fromdate, todate).
+    Интервал делится на отрезки по step секунд, и каждая пара (тег, отрезок) запрашивается в отдельном потоке,
+    но всего не более budget запросов. Вопросы без повторов по question_id сразу записываются в хранилище
+    file_path. Возвращает количество новых вопросов."""
+    quota = Quota(budget)
+    store = open_store(file_path)
+
+    def _job(tag, start, end):
+        shard_params = dict(params, tagged=tag, fromdate=start, todate=end - 1, sort="creation", page=1)
+        return list(fetch_items(URL, shard_params, quota=quota))
+
+    added = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_job, tag, start, end)
+                       for tag in tags for start, end in shards(fromdate, todate, step)]
+            for future in as_completed(futures):
+                added += sum(store.add(item) for item in future.result())
+                store.commit()
+    finally:
+        store.close()
+    print(f"Новых вопросов: {added}, осталось запросов: {quota.remaining}")
+    return added
+
+
+def refresh(store, ids):
+    """Функция запрашивает вопросы по id пачками по IDS_LIMIT штук через /questions/{ids}
+    и обновляет в хранилище те, у которых изменилась дата последней активности.
+    Возвращает количество обновлённых вопросов."""
+    updated = 0
+    for start in range(0, len(ids), IDS_LIMIT):
+        batch = ";".join(str(question_id) for question_id in ids[start:start + IDS_LIMIT])
+        batch_params = {"site": params["site"], "pagesize": IDS_LIMIT, "page": 1}
+        updated += sum(store.update(item) for item in fetch_items(f"{URL}/{batch}", batch_params))
+    return updated
+
+
+def sync(file_path=STORE_FILE, refresh_activity=False):
+    """Функция дополняет хранилище file_path вопросами, созданными после самого нового из уже сохранённых
+    (но не раньше, чем за два дня), поэтому повторный запуск стоит одного-двух запросов к API.
+    При refresh_activity=True также обновляет дату последней активности сохранённых вопросов за два дня.
+    Возвращает список новых вопросов."""
+    store = open_store(file_path)
+    try:
+        fromdate = max(store.high_water() + 1, then)
+        sync_params = dict(params, fromdate=fromdate, todate=int(time.time()), page=1)
+        new = [item for item in fetch_items(URL, sync_params, prefetch=True) if store.add(item)]
+        store.commit()
+        if refresh_activity:
+            new_ids = {item["question_id"] for item in new}
+            ids = [question_id for question_id in store.ids_since(then) if question_id not in new_ids]
+            print(f"Обновлено вопросов: {refresh(store, ids)}")
+            store.commit()
+    finally:
+        store.close()
+    return new
+
+
+if __name__ == '__main__':
+    # python stackoverflow.py harvest <теги через запятую> <ГГГГ-ММ-ДД> <ГГГГ-ММ-ДД> <файл .ndjson или .db>
+    if len(sys.argv) == 6 and sys.argv[1] == "harvest":
+        harvest(sys.argv[2].split(","),
+                int(time.mktime(datetime.date.fromisoformat(sys.argv[3]).timetuple())),
+                int(time.mktime(datetime.date.fromisoformat(sys.argv[4]).timetuple())),
+                sys.argv[5])
+    # python stackoverflow.py [--refresh] - дополнить хранилище новыми вопросами и вывести их
+    else:
+        for number, item in enumerate(sync(refresh_activity="--refresh" in sys.argv), start=1):
+            print(number, item['title'])
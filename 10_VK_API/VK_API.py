@@ -12,19 +12,46 @@
 Вывод print(user) должен выводить ссылку на профиль пользователя в сети VK"""
 
 
-from selenium import webdriver
-from selenium.webdriver.common.action_chains import ActionChains
 import requests
 import json
 import datetime
 import time
 import random
+import heapq
+from array import array
+from collections import Counter
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 users_list = []
+profiles = {}
+friends = {}
 
 now = int(time.mktime(datetime.datetime.now().timetuple()))
 
 
+def get_profiles(ids):
+    """Функция возвращает профили пользователей по списку id.
+    У API запрашиваются только ещё неизвестные профили, не более 1000 id за один запрос,
+    а полученные профили запоминаются на всё время работы программы."""
+    missing = [_id for _id in dict.fromkeys(ids) if _id not in profiles]
+    for start in range(0, len(missing), 1000):
+        params = {
+            'user_ids': ",".join(str(_id) for _id in missing[start:start + 1000]),
+            'access_token': auth.ACCESS_TOKEN,
+            'v': '5.120'
+        }
+        for profile in requests.get('https://api.vk.com/method/users.get?', params=params).json()['response']:
+            profiles[profile['id']] = profile
+    return [profiles[_id] for _id in ids if _id in profiles]
+
+
+def get_name(_id):
+    """Функция возвращает имя и фамилию пользователя"""
+    profile = get_profiles([_id])[0]
+    return profile['first_name'] + ' ' + profile['last_name']
+
+
 class VKAPIAuth:
     ACCESS_TOKEN = ""
 
@@ -62,6 +89,10 @@ class VKAPIAuth:
                 print(self.get_token)
 
     def authorize(self):
+        # Selenium нужен только для получения токена
+        from selenium import webdriver
+        from selenium.webdriver.common.action_chains import ActionChains
+
         print("\nПолучаем токен пользователя")
         # собираем ссылку для авторизации
         url = requests.get(self.AUTHORIZE_URL, params=self.oath_params).url
@@ -144,27 +175,24 @@ class User:
     def __and__(self, other):
         return self.mutual_friends(other.id)
 
+    def recommend(self, k=10):
+        """Метод подбирает пользователю возможных знакомых по количеству общих друзей"""
+        own = get_friends([self.id]).get(self.id)
+        if own is None:
+            raise RuntimeError("Список друзей пользователя недоступен")
+        unavailable = len(own) - len(get_friends(own))
+        if unavailable:
+            print(f'Списки друзей {unavailable} из {len(own)} друзей недоступны и не учитываются в подборе')
+        return recommend(friends, self.id, k)
+
     def user(self, ids=None):
         if ids:
-            user_params = {"user_ids": ids}
-        else:
-            user_params = {"user_ids": self.id}
-        user_params.update(self.params)
-        if ids:
-            if 0 < len(ids) <= 10:
-                user_id = requests.get(self.API_URL + self.methods['users']['get'],
-                                       params=user_params).json()['response'][0]
-                return user_id
-            else:
-                user_ids = requests.get(self.API_URL + self.methods['users']['get'],
-                                        params=user_params).json()['response']
-                return user_ids
-        else:
-            user_id = requests.get(self.API_URL + self.methods['users']['get'],
-                                   params=user_params).json()['response'][0]
-
-            user_name = user_id['first_name'] + ' ' + user_id['last_name']
-            return user_name
+            ids = [int(_id) for _id in str(ids).split(",")]
+            user_ids = get_profiles(ids)
+            if len(ids) == 1:
+                return user_ids[0]
+            return user_ids
+        return get_name(self.id)
 
     def mutual_friends(self, friend):
         mutual_friends_params = {
@@ -175,19 +203,15 @@ class User:
         ids_list = requests.get(user1.API_URL + self.methods['friends']['getMutual'],
                                 params=mutual_friends_params).json()['response']
 
-        ids_str = ''
         friends_list = [User(_id) for _id in ids_list]
-        for _id in ids_list:
-            if not ids_str:
-                ids_str += str(_id)
-            else:
-                ids_str = ids_str + "," + str(_id)
-        mut_friends_names = self.user(ids_str)
+        # все нужные имена получаем одним запросом, дальше они берутся из profiles
+        get_profiles(ids_list + [self.id, friend, user0.id, user1.id])
+        mut_friends_names = get_profiles(ids_list)
         mut_friends_names_list = []
         for _name in mut_friends_names:
             name = _name['first_name'] + ' ' + _name['last_name']
             mut_friends_names_list.append(name)
-        print(f'{self.user()} и {User(friend).user()} имеют {len(mut_friends_names_list)} общих друзей:')
+        print(f'{self.user()} и {get_name(friend)} имеют {len(mut_friends_names_list)} общих друзей:')
         print(*mut_friends_names_list, sep=", ")
         print(f'Все они являются сущностями и хранятся в списке "users_list" '
               f'(также как {user0.user()} и {user1.user()}).')
@@ -196,6 +220,87 @@ class User:
         print()
 
 
+class RateLimiter:
+    """Класс ограничивает частоту запросов к API: не более rate запросов в секунду на все потоки"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.next_time = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now_time = time.monotonic()
+            delay = self.next_time - now_time
+            self.next_time = max(now_time, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+# VK разрешает пользовательскому ключу не более 3 запросов в секунду
+rate_limit = RateLimiter(3)
+# коды ошибок VK: слишком много запросов в секунду; доступ запрещён, профиль удалён или закрыт
+TOO_MANY_REQUESTS = 6
+NO_ACCESS = (15, 18, 30)
+
+
+def fetch_friends(_id, retries=5):
+    """Функция получает список друзей пользователя постранично, по 5000 id за запрос.
+    При ошибке 6 (слишком много запросов) запрос повторяется с растущей паузой.
+    Для закрытых и удалённых профилей возвращается None, при остальных ошибках API - исключение RuntimeError."""
+    result = array('i')
+    params = {'user_id': _id, 'count': 5000, 'offset': 0, 'access_token': auth.ACCESS_TOKEN, 'v': '5.120'}
+    attempt = 0
+    while True:
+        rate_limit.wait()
+        response = requests.get('https://api.vk.com/method/friends.get?', params=params).json()
+        if 'error' in response:
+            code = response['error'].get('error_code')
+            if code == TOO_MANY_REQUESTS and attempt < retries:
+                time.sleep(2 ** attempt)
+                attempt += 1
+                continue
+            if code in NO_ACCESS:
+                return None
+            raise RuntimeError(f"friends.get для {_id}: {response['error'].get('error_msg')}")
+        items = response['response']['items']
+        result.extend(items)
+        if len(items) < params['count']:
+            return result
+        params['offset'] += params['count']
+
+
+def get_friends(ids, workers=3):
+    """Функция возвращает списки друзей пользователей в виде отсортированных массивов целых чисел.
+    Неизвестные списки запрашиваются параллельно в workers потоков (с общим ограничением частоты запросов)
+    и запоминаются в friends. Пользователи, чьи списки недоступны, в результат и в friends не попадают."""
+    missing = [_id for _id in dict.fromkeys(ids) if _id not in friends]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _id, friends_ids in zip(missing, executor.map(fetch_friends, missing)):
+            if friends_ids is not None:
+                friends[_id] = array('i', sorted(friends_ids))
+    return {_id: friends[_id] for _id in ids if _id in friends}
+
+
+def recommend(adjacency, seed, k=10):
+    """Функция подбирает пользователю seed возможных знакомых - друзей его друзей, которые ещё не являются
+    его друзьями, - и возвращает k лучших в виде пар (id, количество общих друзей).
+    adjacency - словарь {id: массив id друзей}."""
+    own = adjacency.get(seed, ())
+    counter = Counter()
+    for friend in own:
+        counter.update(adjacency.get(friend, ()))
+    for excluded in own:
+        counter.pop(excluded, None)
+    counter.pop(seed, None)
+    return heapq.nlargest(k, counter.items(), key=lambda pair: (pair[1], -pair[0]))
+
+
+def recommend_many(adjacency, seeds, k=10):
+    """Функция подбирает возможных знакомых для множества пользователей"""
+    return {seed: recommend(adjacency, seed, k) for seed in seeds}
+
+
 def check_token():
     with open("access_token.json") as file:
         access_key_dict = json.load(file)
@@ -245,6 +350,7 @@ def give_command():
 - "link" для вывода ссылки на профиль пользователя,
 - "all" для вывода  списка id всех известных нам пользователей,
 - "len" для вывода количества всех известных нам пользователей,
+- "rec" для подбора возможных знакомых пользователя по количеству общих друзей,
 
 Для завершения программы введите "exit".
 ==================================="""
@@ -265,12 +371,24 @@ def give_command():
     def print_len_users():
         return len(users_list)
 
+    def recommendations():
+        _user = users_list[int(input("Укажите пользователя: ")) - 1]
+        try:
+            result = _user.recommend()
+        except RuntimeError as error:
+            return f'Не удалось подобрать возможных знакомых: {error}'
+        get_profiles([_id for _id, _count in result])
+        for _id, count in result:
+            print(f'{get_name(_id)} ({_user.URL}{_id}) - общих друзей: {count}')
+        return ''
+
     user_commands = {
         "mut": mutual,
         "name": print_user_name,
         "link": print_user_link,
         "all": print_all_users,
         "len": print_len_users,
+        "rec": recommendations,
         "exit": None
     }
 
@@ -0,0 +1,40 @@
+"""Замер скорости подбора возможных знакомых на случайном графе дружеских связей.
+Запуск: python bench_recommend.py [количество пользователей] [среднее число друзей] [количество seed-пользователей]"""
+import random
+import sys
+import time
+from array import array
+
+from VK_API import recommend_many
+
+
+def synthetic_graph(users, degree, seed=0):
+    """Функция строит случайный неориентированный граф со средней степенью вершины degree"""
+    rnd = random.Random(seed)
+    adjacency = {_id: set() for _id in range(users)}
+    for _ in range(users * degree // 2):
+        first, second = rnd.randrange(users), rnd.randrange(users)
+        if first != second:
+            adjacency[first].add(second)
+            adjacency[second].add(first)
+    return {_id: array('i', sorted(ids)) for _id, ids in adjacency.items()}
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    degree = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    seeds = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    started = time.perf_counter()
+    adjacency = synthetic_graph(users, degree)
+    print(f"Граф: {users} пользователей, в среднем {degree} друзей - {time.perf_counter() - started:.2f} с")
+
+    started = time.perf_counter()
+    result = recommend_many(adjacency, range(seeds), k=10)
+    elapsed = time.perf_counter() - started
+    print(f"Рекомендации для {len(result)} пользователей: {elapsed:.2f} с, "
+          f"{elapsed / len(result) * 1000:.2f} мс на пользователя")
+
+
+if __name__ == '__main__':
+    main()
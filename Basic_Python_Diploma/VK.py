@@ -1,18 +1,126 @@
 """ Модуль определяет порядок авторизации и дальнейшей работы с сервисом vk.com"""
+import heapq
 import json
 import os
+import threading
 import time
 from datetime import datetime
+from itertools import combinations
 
 import requests
-from selenium import webdriver
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.by import By
-from tqdm import tqdm
 
-users_list = []
+from cache import TTLCache, load_caches, save_caches
+from downloader import download_files
+from export import export_photos, photo_record
+from graph import FriendGraph
+from prompts import ask
+from store import PhotoManifest, file_hash
+from tokens import TokenManager
 
-now = int(time.mktime(datetime.now().timetuple()))
+CACHE_FILE = "vk_cache.json"
+# имена пользователей, списки друзей и фотографий, полученные от vk.com
+profiles_cache = TTLCache(ttl=7 * 86400, maxsize=100000)
+friends_cache = TTLCache(ttl=86400, maxsize=10000)
+photos_cache = TTLCache(ttl=3600, maxsize=1000)
+# граф дружеских связей, построенный по загруженным спискам друзей
+friend_graph = FriendGraph()
+# ключ доступа, общий для всех пользователей программы
+token_manager = TokenManager("access_token.json")
+
+
+def load_cache(file_path=CACHE_FILE):
+    """Функция загружает сохранённый при прошлых запусках кэш ответов vk.com"""
+    load_caches(file_path, profiles=profiles_cache, friends=friends_cache, photos=photos_cache)
+
+
+def save_cache(file_path=CACHE_FILE):
+    """Функция сохраняет кэш ответов vk.com для следующих запусков программы"""
+    save_caches(file_path, profiles=profiles_cache, friends=friends_cache, photos=photos_cache)
+
+
+class UsersRegistry:
+    """Класс хранит всех известных программе пользователей: словарь id -> User для поиска за O(1)
+    и список в порядке добавления для обращения к пользователям по индексу"""
+
+    def __init__(self):
+        self._by_id = {}
+        self._order = []
+        self._deferred = []
+        # реестр читают фоновые задания и параллельные шаги сценария, поэтому заведение отложенных
+        # пользователей и добавление новых выполняются под блокировкой (повторно входимой, так как
+        # User.bulk сам обращается к реестру)
+        self._lock = threading.RLock()
+
+    # noinspection Pylint
+    def __contains__(self, user):
+        self._resolve()
+        return getattr(user, 'id', user) in self._by_id
+
+    # noinspection Pylint
+    def __getitem__(self, index):
+        self._resolve()
+        return self._order[index]
+
+    # noinspection Pylint
+    def __iter__(self):
+        self._resolve()
+        return iter(self._order)
+
+    # noinspection Pylint
+    def __len__(self):
+        self._resolve()
+        return len(self._order)
+
+    # noinspection Pylint
+    def __repr__(self):
+        self._resolve()
+        return repr(self._order)
+
+    def defer(self, ids):
+        """Метод откладывает заведение пользователей до первого обращения к реестру"""
+        self._deferred.extend(ids)
+
+    def _resolve(self):
+        with self._lock:
+            if self._deferred:
+                ids, self._deferred = self._deferred, []
+                User.bulk(ids)
+
+    def get(self, _id, default=None):
+        """Метод возвращает пользователя по его id"""
+        self._resolve()
+        return self._by_id.get(_id, default)
+
+    def add(self, user):
+        """Метод добавляет пользователя, если пользователь с таким id ещё не известен.
+        Возвращает пользователя, хранящегося в реестре.
+        Отложенные пользователи заводятся раньше, чтобы порядок (и индексы) не зависел от ключа --fast."""
+        with self._lock:
+            self._resolve()
+            known = self._by_id.setdefault(user.id, user)
+            if known is user:
+                self._order.append(user)
+            return known
+
+    def extend(self, users):
+        """Метод добавляет сразу много пользователей"""
+        with self._lock:
+            for user in users:
+                self.add(user)
+
+
+users_list = UsersRegistry()
+
+
+def ask_credentials():
+    """Функция запрашивает у пользователя логин и пароль от учётной записи ВКонтакте"""
+    print("\n!!!!!!!!!!!!!!!!!!!!!!!!!")
+    print("Для работы программы необходимо ввести данные для авторизации в Вашей учётной записи ВКонтакте.\n")
+    print("Данные запрашиваются только в случае необходимости получения валидного ключа доступа от ВКонтакте.\n")
+    print("Вводимые учётные данные нигде не сохраняются, не передаются никуда, кроме сервиса ВКонтакте")
+    print("и используются только во время работы программы.")
+    print("!!!!!!!!!!!!!!!!!!!!!!!!!")
+    return input("\nВведите логин (номер телефона/e-mail): "), input("Введите пароль: ")
 
 
 class VKAPIAuth:
@@ -31,29 +139,43 @@ class VKAPIAuth:
 
         self.login = login
         self.password = password
-        with open("access_token.json") as file:
-            access_key_dic = json.load(file)
-        if access_key_dic["expires_in"] > now:
-            self.ACCESS_TOKEN = access_key_dic["access_token"]
-            self.expires_in = access_key_dic["expires_in"]
-            print(f"\nТокен пользователя действителен в течение {int((self.expires_in - now) / 3600)} ч.\n")
-        else:
-            self.get_token = self.authorize()
-            if "access_token" in self.get_token:
-                self.ACCESS_TOKEN = self.get_token.split("access_token=")[1].split("&")[0]
-                self.expires_in = int(int(self.get_token.split("expires_in=")[1].split("&")[0]) / 3600)
-                access_key_dic["access_token"] = self.ACCESS_TOKEN
-                access_key_dic["granted"] = now
-                access_key_dic["expires_in"] = now + self.expires_in * 3600
-                with open("access_token.json", "w", encoding="utf-8") as file:
-                    json.dump(access_key_dic, file)
-                print(f"\nТокен пользователя выдан со сроком действия {self.expires_in} ч.\n")
-            else:
-                print("\nЧто-то пошло не так.")
-                print(self.get_token)
+        # провайдер регистрируется всегда: без учётных данных новый ключ получается, когда истечёт старый
+        token_manager.provider = self
+        self.ACCESS_TOKEN = token_manager.token()
+        VKAPIAuth.ACCESS_TOKEN = self.ACCESS_TOKEN
+        self.expires_in = token_manager.expires
+        print(f"\nТокен пользователя действителен в течение {int((self.expires_in - time.time()) / 3600)} ч.\n")
+
+    @property
+    def silent(self):
+        """Можно ли получить новый ключ в фоне, не запрашивая у пользователя логин и пароль"""
+        return self.login is not None
+
+    # noinspection Pylint
+    def __call__(self):
+        """Метод получает новый токен пользователя. Возвращает токен и время окончания его действия.
+        Если логин и пароль ещё не вводились, они запрашиваются у пользователя - но только в основном потоке,
+        так как фоновые задания и пакетный режим не могут запрашивать ввод с клавиатуры."""
+        if not self.silent:
+            if threading.current_thread() is not threading.main_thread():
+                raise RuntimeError("Срок действия ключа доступа ВКонтакте истёк. Выполните любую команду ВКонтакте "
+                                   "не в фоне, чтобы ввести логин и пароль и получить новый ключ")
+            self.login, self.password = ask_credentials()
+        get_token = self.authorize()
+        if "access_token" not in get_token:
+            raise RuntimeError("Что-то пошло не так.\n" + get_token)
+        token = get_token.split("access_token=")[1].split("&")[0]
+        expires_in = int(get_token.split("expires_in=")[1].split("&")[0])
+        print(f"\nТокен пользователя выдан со сроком действия {int(expires_in / 3600)} ч.\n")
+        return token, int(time.time()) + expires_in
 
     def authorize(self):
         """Метод получает токен пользователя"""
+        # Selenium нужен только для авторизации, поэтому он импортируется здесь, а не при запуске программы
+        from selenium import webdriver
+        from selenium.webdriver.common.action_chains import ActionChains
+        from selenium.webdriver.common.by import By
+
         print("\nПолучаем токен пользователя")
         # собираем ссылку для авторизации
         url = requests.get(self.AUTHORIZE_URL, params=self.oath_params).url
@@ -98,37 +220,35 @@ class VKAPIAuth:
 
 class User:
     """Класс определяет методы работы с сервисами vk.com"""
-
-    def __init__(self, _id: int):
+    URL = 'https://vk.com/id'
+    API_URL = 'https://api.vk.com/method/'
+    methods = {
+        'users': {'get': 'users.get?'},
+        'friends': {'get': 'friends.get?',
+                    'areFriends': 'friends.areFriends?',
+                    'getMutual': 'friends.getMutual?',
+                    },
+        'photos': {'get': 'photos.get?',
+                   'get_albums': 'photos.getAlbums?'},
+        'execute': {'execute': 'execute?'},
+    }
+    # ограничения API: не более 25 вызовов в одном execute, не более 100 id в target_uids,
+    # не более 5000 друзей в одном ответе friends.get и не более 1000 фотографий в ответе photos.get
+    EXECUTE_LIMIT = 25
+    TARGET_UIDS_LIMIT = 100
+    FRIENDS_LIMIT = 5000
+    PHOTOS_LIMIT = 1000
+    # коды ошибок VK, означающие, что профиль закрыт, удалён или заблокирован
+    NO_ACCESS = (15, 18, 30)
+    # пользователи с закрытыми или удалёнными профилями, чьи списки друзей получить нельзя
+    friends_unavailable = set()
+
+    def __init__(self, _id: int, register=True):
         self.id = _id
-        self.URL = 'https://vk.com/id'
-        self.API_URL = 'https://api.vk.com/method/'
-        self.params = {
-            'access_token': VKAPIAuth.ACCESS_TOKEN,
-            'v': '5.120'
-        }
-        self.methods = {
-            'users': {'get': 'users.get?'},
-            'friends': {'get': 'friends.get?',
-                        'areFriends': 'friends.areFriends?',
-                        'getMutual': 'friends.getMutual?',
-                        },
-            'photos': {'get': 'photos.get?',
-                       'get_albums': 'photos.getAlbums?'},
-        }
-        user_params = {"user_ids": self.id}
-        user_params.update(self.params)
-        # print(requests.get(self.API_URL + self.methods['users']['get'],
-        #              params=user_params).json())
-        resp = requests.get(self.API_URL + self.methods['users']['get'],
-                            params=user_params).json()['response'][0]
-        self.name = resp['first_name'] + ' ' + resp['last_name']
-        if not users_list:
-            users_list.append(self)
-        else:
-            id_list = {_user.id for _user in users_list}
-            if self.id not in id_list:
-                users_list.append(self)
+        self.fetch_names([self.id])
+        self.name = profiles_cache.get(self.id)
+        if register:
+            users_list.add(self)
 
     # noinspection Pylint
     def __repr__(self):
@@ -140,33 +260,192 @@ class User:
 
     # noinspection Pylint
     def __and__(self, other):
+        # списки друзей обоих пользователей загружаются в граф одним execute, после чего общие друзья
+        # любой пары уже загруженных пользователей находятся без запросов к API
+        self.load_friends([_id for _id in (self.id, other.id)
+                           if _id not in friend_graph and _id not in self.friends_unavailable])
         return self.mutual_friends(other.id)
 
+    def get_friends(self):
+        """Метод получает список id друзей пользователя и добавляет его в граф дружеских связей.
+        Если список получить не удалось (закрытый профиль, ошибка API), возвращает None."""
+        return self.load_friends([self.id]).get(self.id)
+
+    @classmethod
+    def load_friends(cls, ids):
+        """Метод загружает списки друзей множества пользователей через execute и добавляет их в граф
+        дружеских связей. Возвращает словарь {id: [id друзей]}. Пользователи, чей список получить не удалось,
+        в словарь, кэш и граф не попадают: общие друзья с ними запрашиваются через friends.getMutual."""
+        result = {}
+        offsets = {}
+        for _id in dict.fromkeys(ids):
+            friends = friends_cache.get(_id)
+            if friends is None:
+                offsets[_id] = 0
+                result[_id] = []
+            else:
+                result[_id] = friends
+        while offsets:
+            calls = [("friends.get", {"user_id": _id, "count": cls.FRIENDS_LIMIT, "offset": offset})
+                     for _id, offset in offsets.items()]
+            errors = {}
+            for number, ((_method, params), response) in enumerate(zip(calls, cls.execute(calls, errors))):
+                _id = params["user_id"]
+                if not response:
+                    # VK вернул false. Закрытые и удалённые профили запоминаются до конца сеанса,
+                    # а временные ошибки (например, превышение ограничения запросов) просто не кэшируются
+                    del offsets[_id], result[_id]
+                    if errors.get(number) in cls.NO_ACCESS:
+                        cls.friends_unavailable.add(_id)
+                    continue
+                items = response.get("items", [])
+                result[_id].extend(items)
+                if len(items) == cls.FRIENDS_LIMIT:
+                    offsets[_id] += cls.FRIENDS_LIMIT
+                else:
+                    del offsets[_id]
+                    friends_cache.set(_id, result[_id])
+        for _id, friends in result.items():
+            friend_graph.add(_id, friends)
+        return result
+
+    @property
+    def params(self):
+        """Параметры запросов к API с действующим на данный момент ключом доступа"""
+        return self.api_params()
+
+    @staticmethod
+    def api_params():
+        """Метод возвращает общие для всех запросов к API параметры"""
+        return {
+            'access_token': token_manager.token(),
+            'v': '5.120'
+        }
+
+    @classmethod
+    def bulk(cls, ids):
+        """Метод заводит в программу сразу много пользователей. Имена запрашиваются пачками,
+        уже известные пользователи повторно не создаются."""
+        new_ids = [_id for _id in dict.fromkeys(ids) if _id not in users_list]
+        cls.fetch_names(new_ids)
+        users_list.extend(cls(_id, register=False) for _id in new_ids)
+        return [users_list.get(_id) for _id in ids]
+
+    @classmethod
+    def fetch_names(cls, ids):
+        """Метод получает имена пользователей, отсутствующие в кэше, не более чем по 1000 id за запрос"""
+        missing = profiles_cache.missing(ids)
+        for start in range(0, len(missing), 1000):
+            user_params = {"user_ids": ",".join(str(_id) for _id in missing[start:start + 1000])}
+            user_params.update(cls.api_params())
+            response = requests.get(cls.API_URL + cls.methods['users']['get'],
+                                    params=user_params).json()['response']
+            for resp in response:
+                profiles_cache.set(resp['id'], resp['first_name'] + ' ' + resp['last_name'])
+
     def mutual_friends(self, friend):
         """Метод получает список общих друзей двух пользователей"""
-        mutual_friends_params = {
-            'source_uid': self.id,
-            'target_uid': friend,
-        }
-        mutual_friends_params.update(self.params)
-        ids_list = requests.get(self.API_URL + self.methods['friends']['getMutual'],
-                                params=mutual_friends_params).json()['response']
-        time.sleep(1)
-        friends_list = tqdm((User(_id).name for _id in ids_list),
-                            total=len(ids_list),
-                            desc="Получение имён общих друзей")
-        time.sleep(1)
-        print(f'\n{self.name} и {User(friend).name} имеют {len(friends_list)} общих друзей:')
+        ids_list = friends_cache.get((self.id, friend))
+        if ids_list is None and self.id in friend_graph and friend in friend_graph:
+            ids_list = friend_graph.mutual(self.id, friend)
+        if ids_list is None:
+            mutual_friends_params = {
+                'source_uid': self.id,
+                'target_uid': friend,
+            }
+            mutual_friends_params.update(self.params)
+            ids_list = requests.get(self.API_URL + self.methods['friends']['getMutual'],
+                                    params=mutual_friends_params).json()['response']
+            friends_cache.set((self.id, friend), ids_list)
+            friends_cache.set((friend, self.id), ids_list)
+        friends_list = [user.name for user in User.bulk(ids_list)]
+        friend_name = User.bulk([friend])[0].name
+        print(f'\n{self.name} и {friend_name} имеют {len(friends_list)} общих друзей:')
         print(*friends_list, sep=", ", end="\n\n")
-
-    def get_photos(self):
-        """Метод получает ссылки на 5 последних по дате загрузки фотографий из различных альбомов пользователя"""
+        return friends_list
+
+    @classmethod
+    def execute(cls, calls, errors=None):
+        """Метод выполняет список вызовов API вида (метод, параметры), упаковывая их в запросы execute
+        по 25 вызовов. Возвращает ответы в порядке вызовов, для неудавшихся вызовов - False.
+        Если передан словарь errors, в него записываются коды ошибок: {номер вызова: error_code}."""
+        results = []
+        for start in range(0, len(calls), cls.EXECUTE_LIMIT):
+            code = ",".join(f"API.{method}({json.dumps(params)})"
+                            for method, params in calls[start:start + cls.EXECUTE_LIMIT])
+            param = {"code": f"return [{code}];"}
+            param.update(cls.api_params())
+            response = requests.post(cls.API_URL + cls.methods['execute']['execute'], data=param).json()
+            # execute_errors перечисляет ошибки в том же порядке, в котором в ответе стоят false
+            execute_errors = iter(response.get('execute_errors', []))
+            for number, result in enumerate(response['response'], start=start):
+                if result is False and errors is not None:
+                    errors[number] = next(execute_errors, {}).get('error_code')
+            results.extend(response['response'])
+        return results
+
+    @classmethod
+    def mutual_friends_many(cls, pairs):
+        """Метод получает списки общих друзей для множества пар пользователей (source, target).
+        Цели одного источника передаются в friends.getMutual через target_uids, а сами вызовы
+        упаковываются в execute. Возвращает словарь {(source, target): [id общих друзей]}."""
+        result = {}
+        targets = {}
+        for source, target in pairs:
+            ids_list = friends_cache.get((source, target))
+            if ids_list is None and source in friend_graph and target in friend_graph:
+                ids_list = friend_graph.mutual(source, target)
+            if ids_list is None:
+                targets.setdefault(source, {})[target] = None
+            else:
+                result[(source, target)] = ids_list
+
+        calls = []
+        for source, source_targets in targets.items():
+            source_targets = list(source_targets)
+            for start in range(0, len(source_targets), cls.TARGET_UIDS_LIMIT):
+                chunk = source_targets[start:start + cls.TARGET_UIDS_LIMIT]
+                calls.append(("friends.getMutual",
+                              {"source_uid": source, "target_uids": ",".join(str(_id) for _id in chunk)}))
+
+        for (_method, params), response in zip(calls, cls.execute(calls)):
+            for item in response or []:
+                source, target = params["source_uid"], item["id"]
+                ids_list = item.get("common_friends", [])
+                friends_cache.set((source, target), ids_list)
+                friends_cache.set((target, source), ids_list)
+                result[(source, target)] = ids_list
+        return result
+
+    def mutual_friends_with(self, targets):
+        """Метод получает общих друзей пользователя со множеством других пользователей.
+        Возвращает словарь {id: [id общих друзей]}."""
+        pairs = self.mutual_friends_many((self.id, target) for target in targets)
+        return {target: ids_list for (_source, target), ids_list in pairs.items()}
+
+    @classmethod
+    def mutual_matrix(cls, ids):
+        """Метод получает общих друзей для всех пар из списка пользователей.
+        Для 100 пользователей это 99 вызовов friends.getMutual, то есть 4 запроса execute."""
+        pairs = cls.mutual_friends_many(combinations(dict.fromkeys(ids), 2))
+        pairs.update({(target, source): ids_list for (source, target), ids_list in pairs.items()})
+        return pairs
+
+    def get_photos(self, count=5, order="date", size_type=None, export="json"):
+        """Метод получает ссылки на фотографии из альбомов пользователя.
+        По умолчанию выбираются 5 последних по дате загрузки фотографий максимального размера.
+        order="likes" выбирает самые популярные фотографии, size_type - тип размера фотографии (s, m, x, y, z, w...).
+        export="ndjson" или export="packed" дописывает информацию о фотографиях в конец файла выгрузки
+        вместо перезаписи downloaded_vk_photos.json."""
 
         def get_albums():
-            param = {"owner_id": self.id}
-            param.update(self.params)
-            response = requests.get(self.API_URL + self.methods['photos']['get_albums'],
-                                    params=param).json()['response']['items']
+            response = photos_cache.get(self.id)
+            if response is None:
+                param = {"owner_id": self.id}
+                param.update(self.params)
+                response = requests.get(self.API_URL + self.methods['photos']['get_albums'],
+                                        params=param).json()['response']['items']
+                photos_cache.set(self.id, response)
             albums = {num: {album["title"]: album["id"]} for num, album in enumerate(response, start=1)}
             try:
                 last_key = max(albums.keys()) + 1
@@ -182,38 +461,113 @@ class User:
         for keys, values in albums.items():
             for key in values.keys():
                 print(f'{keys}: "{key}"')
-        album_number = albums[int(input("Введите номер альбома: "))]
-        album_id = (album_number[key] for key in album_number.keys())
+        album_number = ask("Введите номер альбома (для загрузки из всех альбомов нажмите Enter): ")
+        if album_number:
+            album_ids = list(albums[int(album_number)].values())
+        else:
+            album_ids = [album_id for album in albums.values() for album_id in album.values()]
+
+        photos_list = [photo for photos in self.fetch_photos(album_ids).values() for photo in photos]
+        selected = self.select_photos(photos_list, count, order, size_type)
 
-        param = {"album_id": album_id, "photo_sizes": "1", 'extended': 1, "owner_id": self.id}
-        param.update(self.params)
-        photos_list = requests.get(self.API_URL + self.methods['photos']['get'],
-                                   params=param).json()['response']['items'][-5:]
+        url_list = [(size['url'], photo['likes']['count'], photo['date'], photo['id']) for photo, size in selected]
+        if export != "json":
+            export_photos("downloaded_vk_photos", (photo_record(photo, size) for photo, size in selected), export)
+            return url_list, self.name
 
         photos_info = []
-        for photo in photos_list:
+        for photo, size in selected:
             info = {
                 "file_name": str(photo['likes']['count']) + "_" + str(
                     datetime.fromtimestamp(photo['date']).date()) + ".jpg",
-                "size": photo['sizes'][-1]['type']
+                "size": size['type']
             }
             photos_info.append(info)
         with open("downloaded_vk_photos.json", "w") as file:
             json.dump(photos_info, file)
-
-        url_list = [(photo['sizes'][-1]['url'], photo['likes']['count'], photo['date']) for photo in photos_list]
         return url_list, self.name
 
+    def fetch_photos(self, album_ids):
+        """Метод получает все фотографии из указанных альбомов пользователя.
+        Первые страницы всех альбомов запрашиваются одним execute, затем по полученному количеству фотографий
+        запрашиваются все оставшиеся страницы по 1000 фотографий. Возвращает словарь {id альбома: [фотографии]}.
+        Альбомы, которые не удалось получить полностью, не кэшируются."""
+        result = {}
+        missing = []
+        for album_id in album_ids:
+            photos = photos_cache.get((self.id, album_id))
+            if photos is None:
+                missing.append(album_id)
+                result[album_id] = []
+            else:
+                result[album_id] = photos
+
+        param = {"owner_id": self.id, "photo_sizes": 1, "extended": 1, "count": self.PHOTOS_LIMIT}
+        calls = [("photos.get", dict(param, album_id=album_id, offset=0)) for album_id in missing]
+        pages = list(zip(calls, self.execute(calls)))
+        tail = [("photos.get", dict(call, offset=offset))
+                for (_method, call), response in pages
+                for offset in range(self.PHOTOS_LIMIT, (response or {}).get("count", 0), self.PHOTOS_LIMIT)]
+        pages.extend(zip(tail, self.execute(tail)))
+
+        failed = set()
+        for (_method, call), response in pages:
+            if not response:
+                # VK вернул false: альбом закрыт или превышено ограничение запросов
+                failed.add(call["album_id"])
+                continue
+            result[call["album_id"]].extend(response.get("items", []))
+        for album_id in missing:
+            if album_id in failed:
+                print(f"Не удалось получить фотографии из альбома {album_id}")
+            else:
+                photos_cache.set((self.id, album_id), result[album_id])
+        return result
+
+    @staticmethod
+    def select_photos(photos, count=5, order="date", size_type=None):
+        """Метод выбирает count фотографий: последних по дате (order="date") или самых популярных (order="likes").
+        Для каждой фотографии выбирается размер size_type, а если его нет или он не задан - максимальный размер.
+        Возвращает список пар (фотография, размер)."""
+        orders = {
+            "date": lambda photo: photo['date'],
+            "likes": lambda photo: (photo['likes']['count'], photo['date']),
+        }
+        selected = heapq.nlargest(count, photos, key=orders[order])
+        result = []
+        for photo in selected:
+            sizes = [size for size in photo['sizes'] if size['type'] == size_type] or photo['sizes']
+            # у старых фотографий ширина и высота равны 0, тогда берётся последний размер в списке
+            _num, size = max(enumerate(sizes), key=lambda pair: (pair[1].get('width', 0) * pair[1].get('height', 0),
+                                                                 pair[0]))
+            result.append((photo, size))
+        return result
+
     @staticmethod
-    def download(urls_list):
-        """Метод скачивает на жесткий диск фотографии пользователя"""
+    def download(urls_list, workers=8):
+        """Метод параллельно скачивает на жесткий диск фотографии пользователя.
+        Фотографии, уже скачанные ранее (по id или по содержимому), повторно не сохраняются."""
         tuples, name = urls_list
         target_folder = os.path.join('downloads', name)
         os.makedirs(target_folder, exist_ok=True)
         target_folder = os.path.abspath(target_folder)
-        for url, likes, date in tqdm(tuples):
-            file_to_download = requests.get(url)
-            with open(os.path.join(target_folder, str(likes) + "_" + str(datetime.fromtimestamp(date).date()) + ".jpg"),
-                      'wb') as file:
-                file.write(file_to_download.content)
+        manifest = PhotoManifest(os.path.join(target_folder, "manifest.json"))
+        jobs = []
+        photo_ids = {}
+        for url, likes, date, photo_id in tuples:
+            if photo_id not in manifest:
+                file_path = os.path.join(target_folder, manifest.name_for(photo_id, likes, date))
+                jobs.append((url, file_path))
+                photo_ids[file_path] = photo_id
+        if len(jobs) < len(tuples):
+            print(f"Ранее скачанных фотографий пропущено: {len(tuples) - len(jobs)}")
+        results = download_files(jobs, workers=workers, desc="Скачивание фотографий")
+        for file_path, result in results.items():
+            if isinstance(result, Exception):
+                print(f'Не удалось скачать "{os.path.basename(file_path)}": {result}')
+                continue
+            kept = manifest.add(os.path.basename(file_path), photo_ids[file_path], file_hash(file_path))
+            if kept != os.path.basename(file_path):
+                os.remove(file_path)
+        manifest.save()
         return target_folder.split(os.path.sep)[-1]
@@ -39,13 +39,20 @@
 import json
 import os
 import sys
+import threading
+import time
 import zipfile
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from tqdm import tqdm
 from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
 
+from downloader import CHUNK_SIZE, make_session
+from prompts import ask
+from sizes import PathTree
+from store import PhotoManifest
+
 
 def track_upload_progress(pbar):
     """Прогресс-бар для загрузки одиночных файлов на Яндекс.Диск"""
@@ -63,39 +70,164 @@ def track_upload_progress(pbar):
 class YaDisk:
     """Класс определяет атрибуты Яндекс.Диска (файлы и папки) и методы работы с ними"""
 
-    def __init__(self, token):
+    def __init__(self, token, lazy=False):
         self.name = None
-        self.all_files = []
-        self.all_folders = []
+        self._files = []
+        self._folders = []
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._catalogues = {}
+        self.tree = PathTree()
+        self._file_index = {}
+        self._folder_index = {}
         self.token = token
         self.URL = "https://cloud-api.yandex.net/v1/disk/resources"
         self.params = {"path": '/'}
         self.headers = {"port": "443", "Authorization": f"OAuth {self.token}"}
-        print("Загрузка содержимого Я.Диска:")
-        self._parse_catalogues()
+        if not lazy:
+            self._load()
 
     # noinspection Pylint
     def __repr__(self):
         return self.name
 
-    def _parse_catalogues(self, path="/"):
-        """Метод получает информацию обо всех файлах и папках на Яндекс.Диске"""
+    @property
+    def all_files(self):
+        """Список файлов Яндекс.Диска. При отложенной загрузке содержимое диска загружается при первом обращении."""
+        self._load()
+        return self._files
+
+    @all_files.setter
+    def all_files(self, value):
+        self._files = value
+
+    @property
+    def all_folders(self):
+        """Список папок Яндекс.Диска. При отложенной загрузке содержимое диска загружается при первом обращении."""
+        self._load()
+        return self._folders
+
+    @all_folders.setter
+    def all_folders(self, value):
+        self._folders = value
+
+    def _load(self):
+        """Метод однократно загружает информацию обо всех файлах и папках на Яндекс.Диске.
+        Одновременные обращения из нескольких потоков дожидаются окончания загрузки."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                files, folders = [], []
+                print("Загрузка содержимого Я.Диска:")
+                self._parse_catalogues(files=files, folders=folders)
+                self._index_sizes(files, folders)
+                self._files, self._folders = files, folders
+                self._loaded = True
+
+    def _parse_catalogues(self, path="/", files=None, folders=None):
+        """Метод получает информацию обо всех файлах и папках на Яндекс.Диске.
+        Если переданы списки files и folders, информация собирается в них, а не в текущие списки.
+        Размеры папок считаются после обхода методом _index_sizes."""
         self._point()
-        yadisk_size = 0
+        files = self.all_files if files is None else files
+        folders = self.all_folders if folders is None else folders
         param = {"path": path}
         response = requests.get(self.URL, params=param, headers=self.headers)
         # try:
         for item in response.json()['_embedded']['items']:
             if item['type'] == "dir":
-                folder_size = self._parse_catalogues(item["path"])
-                yadisk_size += folder_size
-                fsize = {"size": folder_size}
-                item.update(fsize)
-                self.all_folders.append(YaFolder(item))
+                self._parse_catalogues(item["path"], files, folders)
+                item.setdefault("size", 0)
+                folders.append(YaFolder(item))
             else:
-                yadisk_size += item["size"]
-                self.all_files.append(YaFile(item))
-        return yadisk_size
+                files.append(YaFile(item))
+
+    def _index_sizes(self, files, folders):
+        """Метод за один проход по файлам считает размеры всех папок"""
+        self.tree = PathTree.from_files((file.path, file.size) for file in files)
+        self._file_index = {file.path: file for file in files}
+        self._folder_index = {folder.path: folder for folder in folders}
+        for folder in folders:
+            folder.size = self.tree.size(folder.path)
+        self._catalogues = {}
+
+    def _refresh_folders(self, paths):
+        for path in paths:
+            folder = self._folder_index.get(path)
+            if folder is not None:
+                folder.size = self.tree.size(path)
+        self._catalogues = {}
+
+    def update_file(self, item):
+        """Метод учитывает добавление или изменение одного файла (ответ API о ресурсе) без обхода всего диска.
+        Размеры папок, содержащих файл, пересчитываются за время, пропорциональное глубине вложенности."""
+        self._load()
+        file = self._file_index.get(item["path"])
+        if file is None:
+            file = YaFile(item)
+            self._file_index[file.path] = file
+            self.all_files.append(file)
+        else:
+            file.__init__(item)
+        self._refresh_folders(self.tree.set_file(file.path, file.size))
+        return file
+
+    def remove_file(self, path):
+        """Метод учитывает удаление одного файла без обхода всего диска"""
+        self._load()
+        file = self._file_index.pop(path, None)
+        if file is not None:
+            self.all_files.remove(file)
+        self._refresh_folders(self.tree.remove_file(path))
+
+    def remove_folder(self, path):
+        """Метод учитывает удаление папки со всеми вложенными файлами и папками без обхода всего диска"""
+        self._load()
+        prefix = path + "/"
+        for file_path in [file_path for file_path in self._file_index if file_path.startswith(prefix)]:
+            del self._file_index[file_path]
+        for folder_path in [folder_path for folder_path in self._folder_index
+                            if folder_path == path or folder_path.startswith(prefix)]:
+            del self._folder_index[folder_path]
+        # новые списки подменяют старые целиком, как в reload
+        self.all_files = [file for file in self._files if not file.path.startswith(prefix)]
+        self.all_folders = [folder for folder in self._folders
+                            if folder.path != path and not folder.path.startswith(prefix)]
+        self._refresh_folders(self.tree.remove_folder(path))
+
+    def add_folder(self, path):
+        """Метод учитывает созданную папку по одному запросу к API, без обхода всего диска.
+        Возвращает папку или None, если получить информацию о ней не удалось."""
+        self._load()
+        response = requests.get(self.URL, headers=self.headers, params={"path": path, "limit": 0})
+        if response.status_code >= 300:
+            return None
+        item = response.json()
+        folder = self._folder_index.get(item["path"])
+        if folder is None:
+            item.setdefault("size", 0)
+            folder = YaFolder(item)
+            folder.size = self.tree.size(folder.path)
+            self._folder_index[folder.path] = folder
+            self.all_folders.append(folder)
+            self._catalogues = {}
+        return folder
+
+    def _ensure_folders(self, path):
+        """Метод создаёт на Яндекс.Диске все недостающие папки пути path и учитывает их без обхода всего диска"""
+        parts = path.strip("/").split("/")
+        for end in range(1, len(parts) + 1):
+            folder_path = "/".join(parts[:end])
+            self._ensure_folder(folder_path)
+            self.add_folder(folder_path)
+
+    def _forget(self, item):
+        """Метод учитывает удаление файла или папки с Яндекс.Диска"""
+        if item.type == "dir":
+            self.remove_folder(item.path)
+        else:
+            self.remove_file(item.path)
 
     @staticmethod
     def _point():
@@ -105,7 +237,7 @@ class YaDisk:
 
     @staticmethod
     def _size(item):
-        size = int(round(item.size / 1024, 0))
+        size = int(round(getattr(item, "size", item) / 1024, 0))
         if size > 100000:
             size = str(round(size / 1024 ** 2, 2)) + " GB"
         elif 100000 > size > 1000:
@@ -130,7 +262,7 @@ class YaDisk:
                 print("dir <index>" + str(num) + ".", dir)
             print("\nЕсли вы хотите создать папку в корне диска - нажмите Enter.\n"
                   "Если вы хотите создать папку внутри другой папки - введите индекс соответствующей папки.\n")
-            tree = input('Введите ответ?')
+            tree = ask('Введите ответ?')
             if not tree:
                 param = {"path": folder_name}
             else:
@@ -152,7 +284,7 @@ class YaDisk:
         else:
             print(test)
 
-        self.reload()
+        self.add_folder(param["path"])
         print("Текущий список папок:")
         self.print_all('folder')
 
@@ -168,7 +300,7 @@ class YaDisk:
         print("Удаляем", objects)
         print("\nДля удаления объекта(-ов) в Корзину просто нажмите Enter.\n"
               "Для полного удаления объекта(-ов) без возможности восстановления введите 1.")
-        permanent = input("Введите ответ: ")
+        permanent = ask("Введите ответ: ")
         perm_del = ''
         if permanent == "1":
             perm_del = {"permanently": "true"}
@@ -182,6 +314,7 @@ class YaDisk:
                 if put.status_code >= 300:
                     return put.status_code, put.json()
                 _check_existance(param)
+                self._forget(obj)
         else:
             param = {'path': objects.path}
             if perm_del:
@@ -190,12 +323,12 @@ class YaDisk:
             if put.status_code >= 300:
                 return put.status_code, put.json()
             _check_existance(param)
+            self._forget(objects)
 
         if isinstance(objects, list):
             string = ", ".join(obj.name for obj in objects)
         else:
             string = objects
-        self.reload()
         for num, dir in enumerate(self.all_folders):
             print("dir" + str(num) + ".", dir)
         print()
@@ -308,12 +441,40 @@ class YaDisk:
                 print(obj_type + " " + str(num) + ".", file, file.size)
         return collection
 
+    def query(self, string):
+        """Метод выполняет запрос к содержимому Яндекс.Диска и выводит результат.
+        Например: 'file size>1048576 mime=image/jpeg sort=-size limit=10' или 'file by=folder'.
+        Описание языка запросов - в модуле catalogue."""
+        # NumPy нужен только для запросов, поэтому он не загружается при запуске программы
+        from catalogue import Catalogue, parse_query
+
+        obj_type, by, kwargs = parse_query(string)
+        collection = self.all_files if obj_type == 'file' else self.all_folders
+        catalogue = self._catalogues.get(obj_type)
+        if catalogue is None or not catalogue.is_actual(collection):
+            catalogue = self._catalogues[obj_type] = Catalogue(collection)
+        if by:
+            kwargs.pop("sort", None)
+            limit = kwargs.pop("limit", None)
+            groups = catalogue.aggregate(by, **kwargs)[:limit]
+            for num, (key, size) in enumerate(groups, start=1):
+                print(f'{num}. {key}, {self._size(size)}')
+            return groups
+        result = catalogue.query(**kwargs)
+        for num, item in enumerate(result, start=1):
+            print(f'{num}. {item}, {self._size(item)}')
+        return result
+
     def reload(self):
-        """Метод обновляет информацию обо всех файлах и папках на Яндекс.Диске"""
-        self.all_folders = []
-        self.all_files = []
+        """Метод обновляет информацию обо всех файлах и папках на Яндекс.Диске.
+        Новые списки подменяют старые только после полного обхода диска, поэтому во время обновления
+        другие команды продолжают работать с прежними списками."""
+        files, folders = [], []
         print("Обновление содержимого Я.Диска:")
-        self._parse_catalogues()
+        self._parse_catalogues(files=files, folders=folders)
+        self._index_sizes(files, folders)
+        self.all_files, self.all_folders = files, folders
+        self._loaded = True
 
     def top10(self, obj_type=None):
         """Метод выводит на экран топ-10 самых больших папок или файлов.
@@ -330,7 +491,8 @@ class YaDisk:
             top_10 = []
             for num, i in enumerate(top10, start=1):
                 top_10.append(f'{num}. {i}, {self._size(i)}')
-        return print(*top_10, sep="\n", end='\n\n')
+        print(*top_10, sep="\n", end='\n\n')
+        return top_10
 
     def upload(self, object):
         """Метод загруджает на Яндекс.Диск файлы и папки с компьютера, а также фотографии из сети по URL."""
@@ -395,21 +557,28 @@ class YaDisk:
                 )
                 pbar.close()
                 print(f'Файл "{file}" успешно загружен на Яндекс.Диск\n')
+                return param["path"]
             except KeyError:
                 print(f'Файл "{file}" был ранее загружен на Яндекс.Диск\n')
 
-        def _upload_url(url, likes, date):
-            date = str(datetime.fromtimestamp(date).date())
-            param = {"path": target_folderpath + "/" + str(likes) + "_" + date + ".jpg", "url": url}
-            return requests.post(self.URL + "/upload", headers=self.headers, params=param)
+        def _upload_url(url, likes, date, photo_id):
+            file_name = manifest.name_for(photo_id, likes, date)
+            param = {"path": target_folderpath + "/" + file_name, "url": url}
+            response = requests.post(self.URL + "/upload", headers=self.headers, params=param)
+            if response.status_code < 300:
+                manifest.add(file_name, photo_id)
+            return response
 
         if len(object) == 2:
             folder = "photos"
             folder_name = object[1]
             target_folderpath = folder + "/" + folder_name
             _check_folder_exist(folder_name, target_folderpath)
-            for url, likes, date in tqdm(object[0]):
-                _upload_url(url, likes, date)
+            manifest = self.photos_manifest(folder_name)
+            for url, likes, date, photo_id in tqdm(object[0]):
+                if photo_id not in manifest:
+                    _upload_url(url, likes, date, photo_id)
+            manifest.save()
         else:
             object_full_path = str
             if os.path.exists(os.path.abspath(object)):
@@ -436,23 +605,137 @@ class YaDisk:
                     for file in self.all_files:
                         if file.name.split(".")[0] == name:
                             target_folderpath = file.path.split("/" + file.name)[0]
-                            _upload_file(object, target_folderpath, object_full_path)
+                            self._add_uploaded(_upload_file(object, target_folderpath, object_full_path))
                             return
                     for folder in self.all_folders:
                         if folder.name.split(".")[0] == name:
                             target_folderpath = folder.path.split("/" + folder.name)[0]
-                            _upload_file(object, target_folderpath, object_full_path)
+                            self._add_uploaded(_upload_file(object, target_folderpath, object_full_path))
                             return
                 else:
                     folder_name = object_realpath.split("/" + object)[0]
                     target_folderpath = object_realpath.split("/" + object)[0]
-                    _check_folder_exist(folder_name, target_folderpath)
-                    _upload_file(object, target_folderpath, object_full_path)
+                    # папки назначения создаются и учитываются по одной, без обхода всего диска
+                    self._ensure_folders(target_folderpath)
+                    self._add_uploaded(_upload_file(object, target_folderpath, object_full_path))
+                    self.print_all('file')
+                    self.print_all('folder')
+                    return
 
         self.reload()
         self.print_all('file')
         self.print_all('folder')
 
+    def _add_uploaded(self, path):
+        """Метод запрашивает у Яндекс.Диска информацию о загруженном файле и учитывает его без обхода всего диска"""
+        if path is None:
+            return
+        response = requests.get(self.URL, headers=self.headers, params={"path": path})
+        if response.status_code < 300:
+            self.update_file(response.json())
+
+    def transfer(self, photos, mode="auto", workers=4):
+        """Метод переносит фотографии из ВКонтакте на Яндекс.Диск, не сохраняя их на жесткий диск.
+        mode="url" - Яндекс.Диск сам скачивает фотографию по ссылке,
+        mode="relay" - фотография потоком передаётся из ВКонтакте на Яндекс.Диск через программу,
+        mode="auto" - если загрузить фотографию по ссылке не удалось, она передаётся потоком.
+        Одновременно переносится не более workers фотографий. Возвращает отчёт по каждой фотографии."""
+        tuples, name = photos
+        target_folderpath = "photos/" + name
+        self._ensure_folder("photos")
+        self._ensure_folder(target_folderpath)
+        transports = {"url": self._import_url, "relay": self._relay}
+        modes = ["url", "relay"] if mode == "auto" else [mode]
+        manifest = self.photos_manifest(name)
+        new_photos = [(url, photo_id, manifest.name_for(photo_id, likes, date))
+                      for url, likes, date, photo_id in tuples if photo_id not in manifest]
+        if len(new_photos) < len(tuples):
+            print(f"Ранее перенесённых фотографий пропущено: {len(tuples) - len(new_photos)}")
+        session = make_session(workers)
+
+        def _transfer(photo):
+            url, photo_id, file_name = photo
+            path = target_folderpath + "/" + file_name
+            report = {"path": path, "id": photo_id, "mode": None, "size": None, "seconds": None, "error": None}
+            for _mode in modes:
+                started = time.monotonic()
+                try:
+                    size = transports[_mode](session, url, path)
+                except (requests.RequestException, RuntimeError) as error:
+                    report["error"] = str(error)
+                    continue
+                report.update(mode=_mode, size=size, seconds=round(time.monotonic() - started, 3), error=None)
+                break
+            return report
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            reports = list(tqdm(executor.map(_transfer, new_photos), total=len(new_photos),
+                                desc="Перенос фотографий"))
+        session.close()
+        for report in reports:
+            if not report["error"]:
+                manifest.add(report["path"].split("/")[-1], report["id"])
+        manifest.save()
+
+        for report in reports:
+            if report["error"]:
+                print(f'Не удалось перенести "{report["path"]}": {report["error"]}')
+            elif report["size"]:
+                speed = report["size"] / max(report["seconds"], 0.001) / 1024
+                print(f'"{report["path"]}" ({report["mode"]}): {report["size"]} байт за {report["seconds"]} с, '
+                      f'{speed:.0f} КБ/с')
+            else:
+                print(f'"{report["path"]}" ({report["mode"]}): {report["seconds"]} с')
+        done = sum(1 for report in reports if not report["error"])
+        print(f"\nПеренесено фотографий: {done} из {len(reports)}\n")
+        return reports
+
+    @staticmethod
+    def photos_manifest(name):
+        """Метод возвращает манифест фотографий пользователя ВКонтакте, уже загруженных на Яндекс.Диск"""
+        return PhotoManifest(f"yadisk_photos_{name}.json")
+
+    def _ensure_folder(self, path):
+        """Метод создаёт папку на Яндекс.Диске, если её ещё нет, не перечитывая содержимое диска"""
+        put = requests.put(self.URL, headers=self.headers, params={"path": path})
+        if put.status_code not in (201, 409):
+            raise RuntimeError(put.json().get("message", put.status_code))
+
+    def _import_url(self, session, url, path, timeout=60):
+        """Метод поручает Яндекс.Диску скачать файл по ссылке и дожидается окончания операции"""
+        post = session.post(self.URL + "/upload", headers=self.headers, params={"path": path, "url": url})
+        if post.status_code >= 300:
+            raise RuntimeError(post.json().get("message", post.status_code))
+        operation = post.json()["href"]
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            status = session.get(operation, headers=self.headers).json().get("status")
+            if status == "success":
+                return None
+            if status == "failed":
+                raise RuntimeError("Яндекс.Диск не смог скачать файл по ссылке")
+            time.sleep(0.5)
+        raise RuntimeError("Истекло время ожидания загрузки по ссылке")
+
+    def _relay(self, session, url, path):
+        """Метод потоком передаёт файл по ссылке на Яндекс.Диск, не сохраняя его целиком ни в памяти, ни на диске.
+        Возвращает количество переданных байт."""
+        get = session.get(self.URL + "/upload", headers=self.headers, params={"path": path})
+        if get.status_code >= 300:
+            raise RuntimeError(get.json().get("message", get.status_code))
+        sent = 0
+
+        def _chunks():
+            nonlocal sent
+            for data in response.iter_content(chunk_size=CHUNK_SIZE):
+                sent += len(data)
+                yield data
+
+        with session.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            session.put(get.json()["href"], data=_chunks(), timeout=60).raise_for_status()
+        return sent
+
     @staticmethod
     def zip_file(item):
         """Метод архивирует файл или папку в формат zip."""
@@ -0,0 +1,81 @@
+"""Модуль выполняет команды программы без участия пользователя по сценарию из файла.
+Каждая строка сценария - либо json-объект {"command": "mut", "args": [0, 1]}, либо строка вида "mut 0 1".
+Аргументы - ответы на запросы, которые команда задала бы пользователю, в том же порядке.
+Результаты записываются в файл по одной json-строке на команду."""
+import json
+import shlex
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prompts import scripted
+
+# команды, которые только читают уже загруженную информацию и могут выполняться одновременно
+# ("mut" сюда не входит: он заводит общих друзей в список пользователей и сдвигает их индексы)
+READ_ONLY = {"all_vk", "len_vk", "link", "name", "all", "top", "find"}
+
+
+def parse_script(file_path):
+    """Функция читает сценарий и возвращает список троек (команда, аргументы, ошибка разбора).
+    Строка, которую не удалось разобрать, не прерывает чтение: для неё команда равна None, а ошибка
+    содержит номер строки и причину."""
+    steps = []
+    with open(file_path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                if line.startswith("{"):
+                    step = json.loads(line)
+                    steps.append((step["command"].lower(), step.get("args", []), None))
+                else:
+                    command, *args = shlex.split(line)
+                    steps.append((command.lower(), args, None))
+            except (ValueError, KeyError, TypeError, AttributeError) as error:
+                steps.append((None, [], f"Строка {line_number} не разобрана: {type(error).__name__}: {error}"))
+    return steps
+
+
+def run_step(commands, number, command, args, error=None):
+    """Функция выполняет одну команду сценария и возвращает запись о результате.
+    Если передана ошибка разбора строки, команда не выполняется, а ошибка записывается в результат."""
+    record = {"step": number, "command": command, "args": args, "result": None, "error": error}
+    if error is not None:
+        record["seconds"] = 0
+        return record
+    started = time.monotonic()
+    try:
+        if commands.get(command) is None:
+            raise KeyError(f'Команда "{command}" не предусмотрена')
+        with scripted(args):
+            record["result"] = commands[command]()
+    except Exception as error:
+        # ошибка одной команды не должна прерывать весь сценарий
+        record["error"] = f"{type(error).__name__}: {error}"
+    record["seconds"] = round(time.monotonic() - started, 3)
+    return record
+
+
+def run_batch(commands, script_path, output_path="batch_results.jsonl", workers=4):
+    """Функция выполняет сценарий. Идущие подряд команды только для чтения выполняются параллельно,
+    остальные - по одной, в порядке сценария. Возвращает количество команд, завершившихся ошибкой."""
+    steps = list(enumerate(parse_script(script_path), start=1))
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor, \
+            open(output_path, "w", encoding="utf-8") as output:
+        position = 0
+        while position < len(steps):
+            group = [steps[position]]
+            while (group[-1][1][0] in READ_ONLY and position + len(group) < len(steps)
+                   and steps[position + len(group)][1][0] in READ_ONLY):
+                group.append(steps[position + len(group)])
+            position += len(group)
+            futures = [executor.submit(run_step, commands, number, command, args, error)
+                       for number, (command, args, error) in group]
+            for future in futures:
+                record = future.result()
+                failed += bool(record["error"])
+                output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                output.flush()
+    print(f"Выполнено команд: {len(steps)}, с ошибкой: {failed}. Результаты записаны в {output_path}")
+    return failed
@@ -0,0 +1,39 @@
+"""Модуль измеряет время запуска программы: импорт модулей и создание объектов до вывода приглашения.
+Запуск: python bench_startup.py [количество повторов]"""
+import subprocess
+import sys
+import time
+
+SNIPPETS = {
+    "import VK": "import VK",
+    "import YaDisk": "import YaDisk",
+    "import runner": "import runner",
+    "YaDisk(lazy=True)": "import YaDisk; YaDisk.YaDisk('token', lazy=True)",
+    "users_list.defer": "import VK; VK.users_list.defer([273251945, 271138000])",
+}
+
+
+def measure(code, repeat):
+    """Функция запускает код в новом интерпретаторе repeat раз и возвращает лучшее время в миллисекундах"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    baseline = measure("pass", repeat)
+    print(f"{'пустой интерпретатор':<25}{baseline:8.1f} мс")
+    for name, code in SNIPPETS.items():
+        print(f"{name:<25}{measure(code, repeat):8.1f} мс")
+    print("\nselenium загружен при импорте runner:",
+          subprocess.run([sys.executable, "-c", "import runner, sys; print('selenium' in sys.modules)"],
+                         check=True, capture_output=True, text=True).stdout.strip())
+
+
+if __name__ == '__main__':
+    main()
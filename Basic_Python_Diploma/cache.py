@@ -0,0 +1,84 @@
+"""Модуль реализует кэш с ограниченным сроком жизни записей (TTL) и вытеснением давно не используемых записей (LRU)"""
+import json
+import os
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Класс определяет словарь с ограниченным сроком жизни записей и ограниченным количеством записей.
+    При превышении размера вытесняются записи, к которым дольше всего не обращались."""
+
+    def __init__(self, ttl=86400, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    # noinspection Pylint
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    # noinspection Pylint
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Метод возвращает значение по ключу, если срок жизни записи не истёк"""
+        try:
+            expires, value = self._data[key]
+        except KeyError:
+            return default
+        if expires <= time.time():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires=None):
+        """Метод сохраняет значение по ключу и вытесняет самые старые записи при переполнении кэша"""
+        self._data[key] = (expires or time.time() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def missing(self, keys):
+        """Метод возвращает ключи, значений для которых нет в кэше"""
+        return [key for key in keys if key not in self]
+
+    def clear(self):
+        """Метод очищает кэш"""
+        self._data.clear()
+
+    def dump(self):
+        """Метод возвращает действующие записи кэша в виде, пригодном для записи в json"""
+        now = time.time()
+        return [[key, expires, value] for key, (expires, value) in self._data.items() if expires > now]
+
+    def load(self, records):
+        """Метод восстанавливает записи кэша, полученные методом dump.
+        Составные ключи после json приходят списками, поэтому они приводятся обратно к кортежам."""
+        now = time.time()
+        for key, expires, value in records:
+            if expires > now:
+                self.set(tuple(key) if isinstance(key, list) else key, value, expires)
+
+
+def save_caches(file_path, **caches):
+    """Функция записывает содержимое нескольких кэшей в один json-файл"""
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump({name: cache.dump() for name, cache in caches.items()}, file)
+
+
+def load_caches(file_path, **caches):
+    """Функция загружает содержимое нескольких кэшей из json-файла, если он существует"""
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, encoding="utf-8") as file:
+        try:
+            dumped = json.load(file)
+        except ValueError:
+            return
+    for name, cache in caches.items():
+        cache.load(dumped.get(name, []))
@@ -0,0 +1,141 @@
+"""Модуль реализует запросы к содержимому Яндекс.Диска: фильтры по размеру, типу, дате изменения и пути,
+сортировку и суммирование размеров. Атрибуты файлов и папок хранятся в столбцах NumPy, поэтому
+запросы выполняются над всеми объектами сразу, без цикла по ним в Python.
+
+Язык запросов: тип объектов (file или folder), затем условия через пробел, например:
+    file size>1048576 mime=image/jpeg path=/photos after=2020-01-01 sort=-size limit=10
+    file by=folder
+Условия: size>N, size<N, size>=N, size<=N, mime=..., media=..., path=<начало пути>,
+after=ГГГГ-ММ-ДД, before=ГГГГ-ММ-ДД, sort=<столбец> (с минусом - по убыванию), limit=N,
+by=folder|mime|media - суммирование размеров по папкам или типам вместо вывода объектов."""
+import re
+
+import numpy as np
+
+COLUMNS = ("size", "modified", "path", "folder", "mime", "media")
+GROUPS = ("folder", "mime", "media")
+CONDITION = re.compile(r"^(\w+)(>=|<=|>|<|=)(.*)$")
+
+
+def _disk_path(prefix):
+    """Функция приводит путь к виду, в котором его возвращает API Яндекс.Диска"""
+    if prefix.startswith("disk:"):
+        return prefix
+    return "disk:/" + prefix.lstrip("/")
+
+
+def _factorize(values):
+    """Функция заменяет строки целочисленными кодами за один проход по списку.
+    Возвращает массив различных строк (в порядке первого появления) и массив кодов."""
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64,
+                        count=len(values))
+    return np.array(list(index), dtype=str), codes
+
+
+class Catalogue:
+    """Класс хранит атрибуты файлов или папок Яндекс.Диска в виде столбцов NumPy"""
+
+    def __init__(self, items):
+        self.source = items
+        self.items = list(items)
+        count = len(self.items)
+        self.size = np.fromiter((item.size for item in self.items), dtype=np.int64, count=count)
+        self.modified = np.array([item.modified[:19] for item in self.items], dtype="datetime64[s]")
+        self.path = np.array([item.path for item in self.items], dtype=str)
+        folders = [item.path.rsplit("/", 1)[0] for item in self.items]
+        mimes = [getattr(item, "mime_type", "") for item in self.items]
+        medias = [getattr(item, "media_type", "") for item in self.items]
+        self.folder = np.array(folders, dtype=str)
+        self.mime = np.array(mimes, dtype=str)
+        self.media = np.array(medias, dtype=str)
+        # столбцы группировки заранее переводятся в целочисленные коды, чтобы суммирование по группам
+        # сводилось к np.bincount без сортировки строк при каждом запросе
+        self.groups = {"folder": _factorize(folders), "mime": _factorize(mimes), "media": _factorize(medias)}
+
+    # noinspection Pylint
+    def __len__(self):
+        return len(self.items)
+
+    def is_actual(self, items):
+        """Метод проверяет, построен ли каталог по текущему списку объектов"""
+        return self.source is items and len(self.items) == len(items)
+
+    def mask(self, min_size=None, max_size=None, mime=None, media=None, after=None, before=None, prefix=None):
+        """Метод возвращает булев массив объектов, удовлетворяющих всем условиям"""
+        mask = np.ones(len(self.items), dtype=bool)
+        if min_size is not None:
+            mask &= self.size >= min_size
+        if max_size is not None:
+            mask &= self.size <= max_size
+        if mime is not None:
+            mask &= self.mime == mime
+        if media is not None:
+            mask &= self.media == media
+        if after is not None:
+            mask &= self.modified >= np.datetime64(after, "s")
+        if before is not None:
+            mask &= self.modified < np.datetime64(before, "s")
+        if prefix is not None:
+            mask &= np.char.startswith(self.path, _disk_path(prefix))
+        return mask
+
+    def query(self, sort=None, limit=None, **filters):
+        """Метод возвращает объекты, удовлетворяющие условиям, отсортированные по столбцу sort
+        (с минусом в начале - по убыванию) и не более limit штук"""
+        indices = np.flatnonzero(self.mask(**filters))
+        if sort:
+            column = getattr(self, sort.lstrip("-"))[indices]
+            order = np.argsort(column, kind="stable")
+            indices = indices[order[::-1] if sort.startswith("-") else order]
+        if limit is not None:
+            indices = indices[:limit]
+        return [self.items[index] for index in indices]
+
+    def aggregate(self, by="folder", **filters):
+        """Метод суммирует размеры объектов, удовлетворяющих условиям, по папкам или типам.
+        Возвращает список пар (папка или тип, суммарный размер в байтах) по убыванию размера."""
+        mask = self.mask(**filters)
+        keys, codes = self.groups[by]
+        codes = codes[mask]
+        counts = np.bincount(codes, minlength=len(keys))
+        sums = np.bincount(codes, weights=self.size[mask], minlength=len(keys)).astype(np.int64)
+        present = np.flatnonzero(counts)
+        order = present[np.argsort(sums[present], kind="stable")[::-1]]
+        return [(str(keys[index]), int(sums[index])) for index in order]
+
+
+def parse_query(string):
+    """Функция разбирает строку запроса. Возвращает тип объектов, имя группировки (или None)
+    и именованные аргументы для методов Catalogue.query и Catalogue.aggregate."""
+    obj_type, *conditions = string.split()
+    if obj_type not in ("file", "folder"):
+        raise TypeError("Введите file или folder")
+    by = None
+    kwargs = {}
+    for condition in conditions:
+        match = CONDITION.match(condition)
+        if not match:
+            raise ValueError(f'Не удалось разобрать условие "{condition}"')
+        key, operator, value = match.groups()
+        if key == "size":
+            size = int(value)
+            if operator in (">", ">="):
+                kwargs["min_size"] = size + (operator == ">")
+            elif operator in ("<", "<="):
+                kwargs["max_size"] = size - (operator == "<")
+            else:
+                kwargs["min_size"] = kwargs["max_size"] = size
+        elif key in ("mime", "media", "after", "before") and operator == "=":
+            kwargs[key] = value
+        elif key == "path" and operator == "=":
+            kwargs["prefix"] = value
+        elif key == "sort" and operator == "=" and value.lstrip("-") in COLUMNS:
+            kwargs["sort"] = value
+        elif key == "limit" and operator == "=":
+            kwargs["limit"] = int(value)
+        elif key == "by" and operator == "=" and value in GROUPS:
+            by = value
+        else:
+            raise ValueError(f'Условие "{condition}" не предусмотрено')
+    return obj_type, by, kwargs
@@ -0,0 +1,59 @@
+"""Модуль реализует параллельное потоковое скачивание файлов по ссылкам"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+
+CHUNK_SIZE = 64 * 1024
+
+
+def make_session(workers):
+    """Функция создаёт сессию с пулом соединений на каждый поток"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def download_file(session, url, file_path, retries=3, chunk_size=CHUNK_SIZE):
+    """Функция скачивает файл по ссылке частями во временный файл и переименовывает его после успешной загрузки.
+    При ошибке загрузка повторяется до retries раз с нарастающей паузой. Возвращает количество записанных байт."""
+    temp_path = file_path + ".part"
+    for attempt in range(1, retries + 1):
+        try:
+            with session.get(url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                size = 0
+                with open(temp_path, "wb") as file:
+                    for data in response.iter_content(chunk_size=chunk_size):
+                        size += file.write(data)
+            os.replace(temp_path, file_path)
+            return size
+        except (requests.RequestException, OSError):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if attempt == retries:
+                raise
+            time.sleep(2 ** (attempt - 1))
+    return 0
+
+
+def download_files(jobs, workers=8, retries=3, desc="Скачивание файлов"):
+    """Функция параллельно скачивает файлы по списку пар (ссылка, путь к файлу).
+    Возвращает словарь {путь к файлу: количество байт или исключение, если скачать файл не удалось}."""
+    results = {}
+    session = make_session(workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(download_file, session, url, file_path, retries): file_path
+                   for url, file_path in jobs}
+        for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+            try:
+                results[futures[future]] = future.result()
+            except (requests.RequestException, OSError) as error:
+                results[futures[future]] = error
+    session.close()
+    return results
@@ -0,0 +1,79 @@
+"""Модуль реализует дозаписываемые форматы выгрузки информации о фотографиях: NDJSON и двоичный формат
+с записями фиксированной структуры. Файлы дописываются в конец и читаются по одной записи."""
+import json
+import struct
+
+# id владельца, id фотографии, дата загрузки, количество лайков, тип размера, длина ссылки в байтах
+RECORD = struct.Struct("<qqqIcH")
+FIELDS = ("owner_id", "id", "date", "likes", "size", "url")
+
+
+def photo_record(photo, size):
+    """Функция собирает из ответа photos.get и выбранного размера запись для выгрузки"""
+    return {
+        "owner_id": photo['owner_id'],
+        "id": photo['id'],
+        "date": photo['date'],
+        "likes": photo['likes']['count'],
+        "size": size['type'],
+        "url": size['url'],
+    }
+
+
+def append_ndjson(file_path, records):
+    """Функция дописывает записи в файл по одной json-строке на запись. Возвращает количество записей."""
+    count = 0
+    with open(file_path, "a", encoding="utf-8") as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def iter_ndjson(file_path):
+    """Функция построчно читает записи из NDJSON-файла"""
+    with open(file_path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def append_packed(file_path, records):
+    """Функция дописывает записи в двоичный файл: заголовок фиксированной длины и ссылка в utf-8.
+    Возвращает количество записей."""
+    count = 0
+    with open(file_path, "ab") as file:
+        for record in records:
+            url = record["url"].encode("utf-8")
+            file.write(RECORD.pack(record["owner_id"], record["id"], record["date"], record["likes"],
+                                   record["size"].encode("ascii")[:1], len(url)))
+            file.write(url)
+            count += 1
+    return count
+
+
+def iter_packed(file_path):
+    """Функция по одной читает записи из двоичного файла"""
+    with open(file_path, "rb") as file:
+        while True:
+            header = file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            *values, size, url_length = RECORD.unpack(header)
+            url = file.read(url_length).decode("utf-8")
+            yield dict(zip(FIELDS, (*values, size.decode("ascii"), url)))
+
+
+EXPORTERS = {
+    "ndjson": (append_ndjson, ".ndjson"),
+    "packed": (append_packed, ".bin"),
+}
+
+
+def export_photos(base_name, records, fmt="ndjson"):
+    """Функция дописывает записи в файл base_name с расширением, соответствующим формату fmt.
+    Возвращает имя файла."""
+    append, extension = EXPORTERS[fmt]
+    file_path = base_name + extension
+    append(file_path, records)
+    return file_path
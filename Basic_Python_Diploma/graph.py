@@ -0,0 +1,55 @@
+"""Модуль реализует граф дружеских связей, по которому общие друзья и рекомендации считаются локально,
+без обращений к vk.com"""
+from collections import Counter
+
+
+class FriendGraph:
+    """Класс хранит списки друзей пользователей в виде множеств целых чисел"""
+
+    def __init__(self):
+        self._adjacency = {}
+
+    # noinspection Pylint
+    def __contains__(self, user_id):
+        return user_id in self._adjacency
+
+    # noinspection Pylint
+    def __len__(self):
+        return len(self._adjacency)
+
+    def add(self, user_id, friends):
+        """Метод добавляет в граф список друзей пользователя"""
+        self._adjacency[user_id] = frozenset(friends)
+
+    def friends(self, user_id):
+        """Метод возвращает множество друзей пользователя"""
+        return self._adjacency.get(user_id, frozenset())
+
+    def mutual(self, user_id, other_id):
+        """Метод возвращает отсортированный список общих друзей двух пользователей"""
+        return sorted(self.friends(user_id) & self.friends(other_id))
+
+    def mutual_count(self, user_id, other_id):
+        """Метод возвращает количество общих друзей двух пользователей"""
+        return len(self.friends(user_id) & self.friends(other_id))
+
+    def common_neighbours(self, user_id, top=10):
+        """Метод ранжирует пользователей, не являющихся друзьями пользователя, по количеству общих с ним друзей.
+        Учитываются только друзья друзей, чьи списки друзей загружены в граф."""
+        friends = self.friends(user_id)
+        counter = Counter()
+        for friend in friends:
+            if friend in self._adjacency:
+                counter.update(self._adjacency[friend])
+        for excluded in friends | {user_id}:
+            counter.pop(excluded, None)
+        return counter.most_common(top)
+
+    def reachable(self, user_id):
+        """Метод возвращает множество пользователей, достижимых не более чем за два шага"""
+        friends = self.friends(user_id)
+        result = set(friends)
+        for friend in friends:
+            result |= self.friends(friend)
+        result.discard(user_id)
+        return result
@@ -0,0 +1,96 @@
+"""Модуль реализует планировщик фоновых заданий: долгие команды выполняются в пуле потоков,
+пока пользователь продолжает вводить другие команды"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+from prompts import scripted
+
+
+class Job:
+    """Класс описывает фоновое задание: команду, её аргументы, состояние и результат"""
+
+    def __init__(self, job_id, command, args):
+        self.id = job_id
+        self.command = command
+        self.args = args
+        self.status = "в очереди"
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.future = None
+
+    # noinspection Pylint
+    def __str__(self):
+        if self.started is None:
+            elapsed = ""
+        else:
+            elapsed = f", {(self.finished or time.monotonic()) - self.started:.1f} с"
+        return f"[{self.id}] {self.command} {' '.join(map(str, self.args))} - {self.status}{elapsed}"
+
+
+class JobScheduler:
+    """Класс ставит команды в очередь и выполняет их в пуле из workers потоков"""
+
+    def __init__(self, workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, command, func, args):
+        """Метод ставит команду в очередь. Ответы на запросы команды берутся из args, так как фоновое задание
+        не может запрашивать ввод с клавиатуры."""
+        with self._lock:
+            job = Job(next(self._ids), command, list(args))
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, func)
+        return job
+
+    @staticmethod
+    def _run(job, func):
+        job.status = "выполняется"
+        job.started = time.monotonic()
+        try:
+            with scripted(job.args):
+                job.result = func()
+            job.status = "завершено"
+        except Exception as error:
+            # ошибка задания сохраняется и выводится командой jobs, а не прерывает программу
+            job.error = f"{type(error).__name__}: {error}"
+            job.status = "ошибка"
+        job.finished = time.monotonic()
+        return job.result
+
+    def jobs(self):
+        """Метод возвращает список всех заданий"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def get(self, job_id):
+        """Метод возвращает задание по его номеру"""
+        return self._jobs.get(job_id)
+
+    def active(self):
+        """Метод возвращает задания, которые ещё не завершились"""
+        return [job for job in self.jobs() if not job.future.done()]
+
+    def wait(self, job_id=None, timeout=None):
+        """Метод дожидается завершения задания, а если номер не указан - всех заданий"""
+        jobs = [self._jobs[job_id]] if job_id is not None else self.jobs()
+        wait_futures([job.future for job in jobs], timeout=timeout)
+        return jobs
+
+    def cancel(self, job_id):
+        """Метод отменяет задание, которое ещё стоит в очереди. Выполняющееся задание отменить нельзя."""
+        job = self._jobs[job_id]
+        if job.future.cancel():
+            job.status = "отменено"
+            return True
+        return False
+
+    def shutdown(self, wait=True):
+        """Метод останавливает пул потоков"""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,38 @@
+"""Модуль позволяет отвечать на запросы программы как с клавиатуры, так и заранее заданными ответами из сценария"""
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+@contextmanager
+def scripted(answers):
+    """Контекстный менеджер подставляет ответы на запросы ask в текущем потоке вместо ввода с клавиатуры"""
+    _local.answers = iter(answers)
+    try:
+        yield
+    finally:
+        _local.answers = None
+
+
+def ask(prompt=""):
+    """Функция возвращает очередной ответ из сценария, а если сценария нет - запрашивает ввод с клавиатуры"""
+    answers = getattr(_local, "answers", None)
+    if answers is None:
+        return input(prompt)
+    try:
+        return str(next(answers))
+    except StopIteration:
+        raise ValueError(f'Для запроса "{prompt.strip()}" в сценарии не задан ответ') from None
+
+
+def ask_rest(prompt=""):
+    """Функция возвращает все оставшиеся ответы сценария одной строкой через пробел (для запросов, состоящих
+    из нескольких слов, например "find file by=folder"), а если сценария нет - запрашивает ввод с клавиатуры"""
+    answers = getattr(_local, "answers", None)
+    if answers is None:
+        return input(prompt)
+    rest = " ".join(str(answer) for answer in answers)
+    if not rest:
+        raise ValueError(f'Для запроса "{prompt.strip()}" в сценарии не задан ответ')
+    return rest
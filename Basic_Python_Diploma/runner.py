@@ -1,34 +1,27 @@
 """Модуль запускает работу всей программы"""
 
-import json
-import time
-from datetime import datetime
+import os
+import shlex
+import sys
+from contextlib import nullcontext
 
 import VK as vk
 import YaDisk
+from batch import run_batch
+from jobs import JobScheduler
+from prompts import ask, ask_rest, scripted
 
-now = int(time.mktime(datetime.now().timetuple()))
+scheduler = JobScheduler(workers=2)
+# команды, которые сами выводят результат на экран: возвращаемые ими данные нужны только сценариям и заданиям
+PRINTED = {"mut", "top", "find"}
 
 
 def check_token():
     """Модуль проверяет наличие и действительность токена пользователя vk.com"""
-    with open("access_token.json") as file:
-        access_key_dict = json.load(file)
-    if access_key_dict['expires_in'] <= now:
-        print("\n!!!!!!!!!!!!!!!!!!!!!!!!!")
-        print("Для работы программы необходимо ввести данные для авторизации в Вашей учётной записи ВКонтакте.\n")
-        print("Данные запрашиваются только в случае необходимости получения валидного ключа доступа от ВКонтакте.\n")
-        print("Вводимые учётные данные нигде не сохраняются, не передаются никуда, кроме сервиса ВКонтакте")
-        print("и используются только во время работы программы.")
-        print("!!!!!!!!!!!!!!!!!!!!!!!!!")
-        auth_ = vk.VKAPIAuth(login=input("\nВведите логин (номер телефона/e-mail): "),
-                             password=input("Введите пароль: "))
-        vk.VKAPIAuth.ACCESS_TOKEN = auth_.ACCESS_TOKEN
-        return auth_
-    else:
-        auth_ = vk.VKAPIAuth()
-        vk.VKAPIAuth.ACCESS_TOKEN = access_key_dict['access_token']
-        return auth_
+    if not vk.token_manager.valid():
+        login, password = vk.ask_credentials()
+        return vk.VKAPIAuth(login=login, password=password)
+    return vk.VKAPIAuth()
 
 
 def give_command():
@@ -53,10 +46,74 @@ def give_command():
     - "top" для вывода топ-10 файлов или папок на Яндекс.Диске, имеющих самый большой размер
     - "up" для загрузки на Яндекс.Диск файла или папки с жесткого диска
     - "zip" для скачивания и архивирования файла или папки, имеющихсамый большой размер, и загрузки архива обратно
+    - "find" для поиска файлов или папок по условиям и суммирования их размеров, например:
+      "file size>1048576 mime=image/jpeg path=/photos sort=-size limit=10" или "file by=folder"
+
+* Для работы с фоновыми заданиями:
+    - ответы на запросы команды можно указать сразу после неё через пробел, например: "up photos"
+    - пустой ответ (нажатие Enter) указывается как "", например: "pic 0 2 \"\"" - фото из всех альбомов
+    - если в конце добавить " &", команда выполнится в фоне, например: "up photos &", "pic 0 2 \"\" &"
+      (долгие команды "up", "down", "zip" и "pic" удобно запускать именно так)
+    - "jobs" для вывода списка фоновых заданий и их состояния
+    - "wait" для ожидания завершения фонового задания
+    - "cancel" для отмены фонового задания, ещё стоящего в очереди
 
 Для завершения программы введите "exit".
 ==================================="""
 
+    user_commands = commands()
+
+    command = None
+    print()
+    print(give_command.__doc__)
+    print()
+
+    while command != "exit":
+        command = None
+        while command not in user_commands.keys():
+            print('Для вывода описания команд введите "help".')
+            try:
+                command, *args = shlex.split(input("Введите команду: ").strip()) or [None]
+            except ValueError as error:
+                # например, незакрытая кавычка
+                print(f"Не удалось разобрать команду: {error}")
+                command = None
+            command = command and command.lower()
+        else:
+            background = args[-1:] == ["&"]
+            if background:
+                args = args[:-1]
+            if command == "exit":
+                if scheduler.active():
+                    print("Ожидание завершения фоновых заданий...")
+                scheduler.shutdown()
+                vk.save_cache()
+                print()
+                print("Работа программы завершена")
+                break
+            elif command == "help":
+                print()
+                print(give_command.__doc__)
+                print()
+                continue
+            try:
+                if background:
+                    job = scheduler.submit(command, user_commands[command], args)
+                    print(f"Задание {job.id} запущено в фоне")
+                else:
+                    with scripted(args) if args else nullcontext():
+                        result = user_commands[command]()
+                    if command not in PRINTED:
+                        print(result)
+            except Exception as error:
+                # ошибка одной команды (неверный индекс, нехватка ответов, сбой сети) не должна завершать программу
+                print(f'Команда "{command}" завершилась ошибкой: {type(error).__name__}: {error}')
+            print()
+
+
+def commands():
+    """Функция возвращает словарь команд программы"""
+
     def _all_users_names():
         """Метод выводит имена всех уже известных пользователей ВКонтакте"""
 
@@ -113,45 +170,45 @@ def give_command():
 
         for num, name in enumerate(_all_users_names()):
             print(str(num) + " " + name)
-        user = vk.users_list[int(input("Укажите пользователя: "))]
+        user = vk.users_list[int(ask("Укажите пользователя: "))]
         print('Для скачивания фотографий на жесткий диск введите "1"')
         print('Для загрузки фотографий на Яндекс.Диск введите "2"')
         print('Для скачивания фотографий на жесткий диск и загрузки фотографий на Яндекс.Диск введите "3"')
         methods = (1, 2, 3)
-        method = int(input("Введите ответ: "))
+        method = int(ask("Введите ответ: "))
         photos = user.get_photos()
         while method not in methods:
             print("Такая команда не предусмотрена")
-            method = int(input("Введите ответ: "))
+            method = int(ask("Введите ответ: "))
         if method == 1:
             user.download(photos)
             return "Фотографии успешно загружены на жесткий диск"
         elif method == 2:
-            ya.upload(photos)
+            ya.transfer(photos)
             ya.reload()
-            return "Фотографии успешно загружены на Яндекс.Диск"
+            return "Фотографии загружены на Яндекс.Диск"
         elif method == 3:
-            ya.upload(photos)
+            ya.transfer(photos)
             user.download(photos)
             ya.reload()
-            return "Фотографии успешно загружены на жесткий диск и на Яндекс.Диск"
+            return "Фотографии загружены на жесткий диск и на Яндекс.Диск"
 
     def mutual():
         """Метод выводит перечень общих друзей двух пользователей ВКонтакте"""
 
-        _user1 = int(input("Укажите пользователя 1: "))
-        _user2 = int(input("Укажите пользователя 2: "))
+        _user1 = int(ask("Укажите пользователя 1: "))
+        _user2 = int(ask("Укажите пользователя 2: "))
         return vk.users_list[_user1] & vk.users_list[_user2]
 
     def print_user_name():
         """Метод выводит имя уже известного пользователя ВКонтакте"""
 
-        return vk.users_list[int(input("Укажите пользователя: "))].name
+        return vk.users_list[int(ask("Укажите пользователя: "))].name
 
     def print_user_link():
         """Метод выводит ссылку на страницу уже известного пользователя ВКонтакте"""
 
-        return vk.users_list[int(input("Укажите пользователя: "))]
+        return vk.users_list[int(ask("Укажите пользователя: "))]
 
     def print_all_users():
         """Метод выводит id уже известных пользователей ВКонтакте"""
@@ -166,7 +223,7 @@ def give_command():
     def create_folder():
         """Метод создаёт папку на Яндекс.Диске"""
 
-        return ya.create_folder(input("Введите имя папки (без пути): "))
+        return ya.create_folder(ask("Введите имя папки (без пути): "))
 
     def delete():
         """Метод удаляет папку, файл или группу папок или файлов на Яндекс.Диске"""
@@ -175,7 +232,7 @@ def give_command():
             print(num, dir)
         print("Для удаления объекта необходимо ввести его тип, а также его индекс или срез")
         print("Например: file[1], folder[3::-1]")
-        string = input("Введите тип объекта для удаления, его индекс или срез: ")
+        string = ask("Введите тип объекта для удаления, его индекс или срез: ")
         split = _split(string)
         collection, slice = split
         print(slice)
@@ -184,7 +241,7 @@ def give_command():
     def download():
         """Метод скачивает папку, файл с Яндекс.Диска на жесткий диск"""
 
-        objects = input("Для скачивания объекта необходимо ввести его тип: ")
+        objects = ask("Для скачивания объекта необходимо ввести его тип: ")
         if objects == "file":
             object = ya.all_files
         elif objects == "folder":
@@ -193,14 +250,14 @@ def give_command():
             return "Такой тип объекта отсутствует. Попробуйте снова."
         for num, dir in enumerate(print_all_objects(objects)):
             print(num, dir)
-        index = int(input("Введите индекс объекта для скачивания: "))
+        index = int(ask("Введите индекс объекта для скачивания: "))
         return ya.download(object[index])
 
     def find_biggest():
         """Метод выводит имя файла или папки Яндекс.Диска, имеющих самый большой размер"""
 
         print("Для поиска самого большого объекта необходимо ввести его тип: file или folder")
-        return ya.find_biggest(input("Введите тип объектa: "))
+        return ya.find_biggest(ask("Введите тип объектa: "))
 
     def print_all_objects(obj_type=None):
         """Метод выводит на экран перечень всех файлов или папкок Яндекс.Диска"""
@@ -209,13 +266,13 @@ def give_command():
             return _split(obj_type)
         else:
             print("Для вывода всех папок или файлов необходимо ввести тип объектов: file или folder")
-            return _split(input("Введите тип объектов: "))
+            return _split(ask("Введите тип объектов: "))
 
     def top_10():
         """Метод выводит топ-10 файлов или папкок Яндекс.Диска, имеющих самый большой размер"""
 
         print("Для подборки самых больших объектов необходимо ввести их тип: file или folder")
-        return ya.top10(input("Введите тип объектов: "))
+        return ya.top10(ask("Введите тип объектов: "))
 
     def upload(object=None):
         """Метод загружает папку, файл с жесткого диска или фотографии по url из ВКонтакте на Яндекс.Диск"""
@@ -223,7 +280,7 @@ def give_command():
         if object:
             obj = object
         else:
-            obj = input("Введите имя папки или файла (без пути): ")
+            obj = ask("Введите имя папки или файла (без пути): ")
         return ya.upload(obj)
 
     def zipfile():
@@ -232,8 +289,8 @@ def give_command():
 
         print('Если после загрузки архива Вы хотите удалить архивируемый объект c Яндекс.Диска - введите "1"')
         print("В противном случае нажмите Enter")
-        _del = input("Введите ответ: ")
-        object = input('Введите тип объекта ("file" или "folder"): ')
+        _del = ask("Введите ответ: ")
+        object = ask('Введите тип объекта ("file" или "folder"): ')
         if _del == "1":
             big = ya.find_biggest(object)
             ya.download(big)
@@ -249,11 +306,49 @@ def give_command():
         else:
             return 'Такой команды не предусмотрено. Попробуйте снова'
 
+    def find():
+        """Метод ищет файлы или папки Яндекс.Диска по условиям или суммирует их размеры по папкам или типам"""
+
+        print("Условия: size>N, size<N, mime=..., media=..., path=..., after=ГГГГ-ММ-ДД, before=ГГГГ-ММ-ДД,")
+        print("sort=size|-size|modified|-modified|path, limit=N, by=folder|mime|media")
+        return ya.query(ask_rest("Введите запрос: "))
+
     def user():
         """Метод задаёт нового пользователя ВКонтакте"""
-        return vk.User(int(input("Введите id пользоваьтеля: ")))
-
-    user_commands = {
+        return vk.User(int(ask("Введите id пользоваьтеля: ")))
+
+    def print_jobs():
+        """Метод выводит список фоновых заданий"""
+
+        for job in scheduler.jobs():
+            print(job)
+            if job.error:
+                print("    " + job.error)
+        return f"Выполняется или ожидает заданий: {len(scheduler.active())}"
+
+    def wait_job():
+        """Метод дожидается завершения фонового задания и выводит его результат"""
+
+        job_id = ask("Введите номер задания (для ожидания всех заданий нажмите Enter): ")
+        if job_id and scheduler.get(int(job_id)) is None:
+            return f"Задания {job_id} нет"
+        jobs = scheduler.wait(int(job_id) if job_id else None)
+        for job in jobs:
+            print(job)
+            print("    " + str(job.error or job.result))
+        return "Ожидание завершено"
+
+    def cancel_job():
+        """Метод отменяет фоновое задание, ещё стоящее в очереди"""
+
+        job_id = int(ask("Введите номер задания: "))
+        if scheduler.get(job_id) is None:
+            return f"Задания {job_id} нет"
+        if scheduler.cancel(job_id):
+            return f"Задание {job_id} отменено"
+        return f"Задание {job_id} уже выполняется или завершено и не может быть отменено"
+
+    return {
         "user": user,
         "pic": photos,
         "mut": mutual,
@@ -269,38 +364,32 @@ def give_command():
         "top": top_10,
         "up": upload,
         "zip": zipfile,
+        "find": find,
+        "jobs": print_jobs,
+        "wait": wait_job,
+        "cancel": cancel_job,
         "help": None,
         "exit": None
     }
 
-    command = None
-    print()
-    print(give_command.__doc__)
-    print()
-
-    while command != "exit":
-        command = None
-        while command not in user_commands.keys():
-            print('Для вывода описания команд введите "help".')
-            command = input("Введите команду: ").lower().strip()
-        else:
-            if command == "exit":
-                print()
-                print("Работа программы завершена")
-                break
-            elif command == "help":
-                print()
-                print(give_command.__doc__)
-                print()
-            else:
-                print(user_commands[command]())
-                print()
-
 
 if __name__ == '__main__':
+    # с ключом --fast пользователи ВКонтакте и содержимое Яндекс.Диска загружаются при первом обращении к ним
+    fast = "--fast" in sys.argv
     auth = check_token()
-    user0 = vk.User(273251945)
-    user1 = vk.User(271138000)
-    access_token = input("Введите токен Яндекс.Диска (получить его можно тут - https://yandex.ru/dev/disk/poligon/): ")
-    ya = YaDisk.YaDisk(access_token)
+    vk.load_cache()
+    if fast:
+        vk.users_list.defer([273251945, 271138000])
+    else:
+        user0 = vk.User(273251945)
+        user1 = vk.User(271138000)
+    access_token = os.environ.get("YADISK_TOKEN") or input(
+        "Введите токен Яндекс.Диска (получить его можно тут - https://yandex.ru/dev/disk/poligon/): ")
+    ya = YaDisk.YaDisk(access_token, lazy=fast)
+    # с ключом --batch <файл сценария> [--output <файл результатов>] команды выполняются без участия пользователя
+    if "--batch" in sys.argv:
+        output = sys.argv[sys.argv.index("--output") + 1] if "--output" in sys.argv else "batch_results.jsonl"
+        failed = run_batch(commands(), sys.argv[sys.argv.index("--batch") + 1], output)
+        vk.save_cache()
+        sys.exit(1 if failed else 0)
     give_command()
@@ -0,0 +1,53 @@
+"""Модуль реализует подсчёт размеров папок по размерам файлов: для каждой папки хранится суммарный размер
+всех вложенных в неё файлов, а изменение одного файла обновляет только его родительские папки"""
+
+
+class PathTree:
+    """Класс хранит размеры файлов и суммарные размеры всех папок-предков этих файлов"""
+
+    def __init__(self):
+        self._files = {}
+        self._totals = {}
+
+    @classmethod
+    def from_files(cls, files):
+        """Метод строит дерево за один проход по парам (путь файла, размер)"""
+        tree = cls()
+        for path, size in files:
+            tree.set_file(path, size)
+        return tree
+
+    @staticmethod
+    def ancestors(path):
+        """Метод возвращает пути всех папок, содержащих файл или папку, от ближайшей к корню диска"""
+        parts = path.split("/")
+        return ["/".join(parts[:end]) for end in range(len(parts) - 1, 0, -1)]
+
+    def _propagate(self, path, delta):
+        ancestors = self.ancestors(path)
+        for ancestor in ancestors:
+            self._totals[ancestor] = self._totals.get(ancestor, 0) + delta
+        return ancestors
+
+    def set_file(self, path, size):
+        """Метод добавляет файл или изменяет его размер. Возвращает пути папок, размер которых изменился."""
+        delta = size - self._files.get(path, 0)
+        self._files[path] = size
+        return self._propagate(path, delta)
+
+    def remove_file(self, path):
+        """Метод удаляет файл. Возвращает пути папок, размер которых изменился."""
+        return self._propagate(path, -self._files.pop(path, 0))
+
+    def remove_folder(self, path):
+        """Метод удаляет папку со всеми вложенными файлами. Возвращает пути папок, размер которых изменился."""
+        for file_path in [file_path for file_path in self._files if file_path.startswith(path + "/")]:
+            self.remove_file(file_path)
+        for folder_path in [folder_path for folder_path in self._totals
+                            if folder_path == path or folder_path.startswith(path + "/")]:
+            del self._totals[folder_path]
+        return self.ancestors(path)
+
+    def size(self, path):
+        """Метод возвращает суммарный размер файлов в папке, включая вложенные папки"""
+        return self._totals.get(path, 0)
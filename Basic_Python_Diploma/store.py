@@ -0,0 +1,69 @@
+"""Модуль реализует манифест скачанных фотографий: какое имя файла соответствует каким фотографиям ВКонтакте
+и какому содержимому. По манифесту уже сохранённые фотографии не скачиваются повторно, а фотографии
+с одинаковыми лайками и датой получают разные имена."""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+
+def file_hash(file_path, chunk_size=64 * 1024):
+    """Функция считает sha256 содержимого файла, читая его частями"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for data in iter(lambda: file.read(chunk_size), b""):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+class PhotoManifest:
+    """Класс хранит соответствие имён файлов id фотографий ВКонтакте и sha256 их содержимого"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.files = {}
+        if os.path.exists(file_path):
+            with open(file_path, encoding="utf-8") as file:
+                self.files = json.load(file)
+        self._by_id = {}
+        self._by_hash = {}
+        for name, entry in self.files.items():
+            self._index(name, entry)
+        self._reserved = {}
+
+    # noinspection Pylint
+    def __contains__(self, photo_id):
+        return photo_id in self._by_id
+
+    def _index(self, name, entry):
+        for photo_id in entry["ids"]:
+            self._by_id[photo_id] = name
+        if entry.get("sha256"):
+            self._by_hash[entry["sha256"]] = name
+
+    def name_for(self, photo_id, likes, date):
+        """Метод возвращает имя файла для фотографии: "<лайки>_<дата>.jpg", а если такое имя уже занято
+        другой фотографией - "<лайки>_<дата>_<id фотографии>.jpg\""""
+        if photo_id in self._by_id:
+            return self._by_id[photo_id]
+        base = str(likes) + "_" + str(datetime.fromtimestamp(date).date())
+        name = base + ".jpg"
+        if self._reserved.get(name, photo_id) != photo_id or name in self.files:
+            name = base + "_" + str(photo_id) + ".jpg"
+        self._reserved[name] = photo_id
+        return name
+
+    def add(self, name, photo_id, sha256=None):
+        """Метод записывает в манифест сохранённую фотографию. Если файл с таким же содержимым уже есть,
+        фотография привязывается к нему. Возвращает имя файла, под которым хранится содержимое."""
+        name = self._by_hash.get(sha256, name) if sha256 else name
+        entry = self.files.setdefault(name, {"ids": [], "sha256": sha256})
+        if photo_id not in entry["ids"]:
+            entry["ids"].append(photo_id)
+        self._index(name, entry)
+        return name
+
+    def save(self):
+        """Метод записывает манифест на диск"""
+        with open(self.file_path, "w", encoding="utf-8") as file:
+            json.dump(self.files, file, ensure_ascii=False)
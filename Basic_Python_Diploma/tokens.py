@@ -0,0 +1,89 @@
+"""Модуль хранит ключ доступа в памяти и заранее обновляет его в фоне, не дожидаясь окончания срока действия"""
+import json
+import os
+import threading
+import time
+
+
+class StubAuthProvider:
+    """Класс выдаёт фиксированный ключ доступа без обращения к сервису авторизации. Предназначен для тестов."""
+
+    def __init__(self, token="stub", ttl=86400):
+        self.token = token
+        self.ttl = ttl
+
+    # noinspection Pylint
+    def __call__(self):
+        return self.token, int(time.time()) + self.ttl
+
+
+class TokenManager:
+    """Класс хранит единственный на всю программу ключ доступа.
+    Ключ читается из файла один раз, а за refresh_ahead секунд до окончания срока действия обновляется в фоне
+    с помощью provider - вызываемого объекта, возвращающего ключ и время окончания его действия.
+    Если у provider есть атрибут silent=False (ключ нельзя получить без участия пользователя), фоновое обновление
+    не выполняется, и новый ключ получается при первом обращении после окончания срока действия старого."""
+
+    def __init__(self, file_path=None, provider=None, refresh_ahead=3600):
+        self.file_path = file_path
+        self.provider = provider
+        self.refresh_ahead = refresh_ahead
+        self.expires = 0
+        self._token = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._next_attempt = 0
+
+    def _load(self):
+        """Метод однократно читает ключ доступа из файла"""
+        self._loaded = True
+        if self.file_path and os.path.exists(self.file_path):
+            with open(self.file_path, encoding="utf-8") as file:
+                access_key_dic = json.load(file)
+            self._token = access_key_dic.get("access_token")
+            self.expires = access_key_dic.get("expires_in", 0)
+
+    def _save(self, token, expires):
+        self._token, self.expires = token, expires
+        if self.file_path:
+            with open(self.file_path, "w", encoding="utf-8") as file:
+                json.dump({"access_token": token, "granted": int(time.time()), "expires_in": expires}, file)
+
+    def valid(self):
+        """Метод проверяет, есть ли действительный ключ доступа"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return bool(self._token) and self.expires > time.time()
+
+    def token(self):
+        """Метод возвращает действительный ключ доступа.
+        Если срок действия ключа истёк, новый ключ получается сразу, если истекает - в фоновом потоке."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            left = self.expires - time.time()
+            if not self._token or left <= 0:
+                if self.provider is None:
+                    raise RuntimeError("Нет действительного ключа доступа и способа его получить")
+                self._save(*self.provider())
+            elif (left < self.refresh_ahead and getattr(self.provider, "silent", self.provider is not None)
+                  and self._refresher is None and time.time() >= self._next_attempt):
+                self._refresher = threading.Thread(target=self._background_refresh, daemon=True)
+                self._refresher.start()
+            return self._token
+
+    def _background_refresh(self):
+        # старый ключ ещё действует, поэтому при ошибке следующая попытка откладывается на 5 минут
+        try:
+            token, expires = self.provider()
+        except Exception as error:
+            print(f"\nНе удалось заранее обновить ключ доступа: {error}")
+            token, expires = None, 0
+        with self._lock:
+            if token:
+                self._save(token, expires)
+            else:
+                self._next_attempt = time.time() + 300
+            self._refresher = None